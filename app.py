@@ -1,291 +1,248 @@
-import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.express as px
 import streamlit as st
-import plotly.graph_objects as go
 
-st.title('Comrades 2025 Results Analysis')
-st.markdown('This app allows you to explore the results of the Comrades Marathon 2025. ' \
+from charts import (RENDER_MODES, category_bar_figure, country_bar_figure, cut_off_band_figure,
+                    overall_strip_figure, participant_figure, performance_gauge, status_bar_figure,
+                    wave_strip_figure)
+from cohorts import Cohorts
+from cut_offs import BREAKDOWNS, CUT_OFFS, CutOffBands
+from instrumentation import PROFILE_ALL, TRACE_ALL, Profiler
+from participant_index import ParticipantIndex
+from rankings import Rankings
+from results_catalog import Catalog, partition_label
+from results_store import CUT_OFF_SECONDS, dataset_version
+from rollups import Rollups
+from time_parsing import format_seconds
+
+LIVE_REFRESH_SECONDS = 15
+
+# every race edition in the results catalog, only the chosen one is loaded
+catalog = Catalog.open()
+edition = st.sidebar.selectbox('Race', list(catalog.partitions), format_func=lambda key: partition_label(catalog[key]))
+year = catalog[edition].year
+
+# how the 22k-point strip plots are drawn, 'auto' switches to binned densities for big fields
+render_mode = st.sidebar.selectbox('Finish time charts', RENDER_MODES,
+                                   format_func={'auto': 'Automatic', 'points': 'Every runner (WebGL)',
+                                                'density': 'Density (binned)'}.get)
+
+# on race day live_ingest.py rewrites the results file, rerun the page whenever it has a new version
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def follow_live_results(version):
+    if dataset_version(catalog[edition].path) != version:
+        st.rerun()
+    st.caption(f'Checking for new results every {LIVE_REFRESH_SECONDS} seconds')
+
+
+if st.sidebar.toggle('Follow live results'):
+    with st.sidebar:
+        follow_live_results(dataset_version(catalog[edition].path))
+
+# opt-in per-stage timings, the stages below are no-ops unless this is on
+with st.sidebar.expander('Debug'):
+    profile = st.checkbox('Show stage timings', value=PROFILE_ALL)
+    trace_memory = st.checkbox('Trace allocations (slower)', value=TRACE_ALL, disabled=not profile)
+profiler = Profiler(enabled=profile, trace_memory=trace_memory)
+
+st.title(f'Comrades {year} Results Analysis')
+st.markdown(f'This app allows you to explore the results of the Comrades Marathon {year}. ' \
 'You can view the distribution of finish times, the top countries by number of participants, and the distribution of participants by age category. ' \
 'You can also select a participant to view their details. Please ensure that you are in light mode for the best experience.')
 
-df = pd.read_csv('comrades_2025_results.csv')
-
-df['Pos'] = df['Pos'].astype('Int32')
-df['Cat Pos'] = df['Cat Pos'].astype('Int32')
-df['Gen Pos'] = df['Gen Pos'].astype('Int32')
-
-# convert the values of DNF, Not started, UOF, Started in the time column to their own boolean columns
-df['DNF'] = df['Time'].str.contains('DNF')
-df['Not started'] = df['Time'].str.contains('Not started')
-df['UOF'] = df['Time'].str.contains('UOF')
-df['Started'] = df['Time'].str.contains('Started') 
-df['DNS'] = df['Time'].str.contains('DNS') 
-
-# create a single column called 'Status' that contains the status of the participant
-df['Status'] = np.select(
-    [df['DNF'], df['Not started'], df['UOF'], df['Started'], df['DNS']],
-    ['Did Not Finish', 'Not started', 'Unofficial Finisher', 'Started', 'Did Not Start'],
-    default='Finished'
-)
-
-# create a horizontal bar chart showing the distribution of participants by status
-fig_bar_status = px.bar(df['Status'].value_counts().sort_values(ascending=True).reset_index(),
-                        x='count',
-                        y='Status',
-                        title='Number of Participants by Finishing Status',
-                        color_discrete_sequence=['darkred'],
-                        orientation='h')
-fig_bar_status.update_layout(
-    title_font_size=24,
-    font=dict(size=14),
-    xaxis_title="Number of Participants",
-    yaxis_title="Status",
-    xaxis=dict(
-        tickfont=dict(size=16)
-    ),
-    yaxis=dict(
-        tickfont=dict(size=16)
-    )
-)
-fig_bar_status.update_traces(
-    textposition='inside',
-    text=df['Status'].value_counts().sort_values(ascending=True),
-    texttemplate='%{text:,}'
-)
-st.plotly_chart(fig_bar_status, use_container_width=True)
-
-
-
-# create a horizontal bar chart showing the top 10 countries by number of participants
-top_10_countries = df['Country'].value_counts().nlargest(5).sort_values(ascending=True)
-fig_bar_countries = px.bar(top_10_countries.reset_index(),
-                        x='count',
-                        y='Country',
-                        title='Top 5 Countries by Number of Participants',
-                        color_discrete_sequence=['darkgreen'],
-                        orientation='h')
-fig_bar_countries.update_layout(
-    title_font_size=24,
-    font=dict(size=14),
-    xaxis_title="Number of Participants",
-    yaxis_title="Country",
-    xaxis=dict(
-        tickfont=dict(size=16)
-    ),
-    yaxis=dict(
-        tickfont=dict(size=16)
-    )
-)
-fig_bar_countries.update_traces(
-    textposition='inside',
-    text=top_10_countries,
-    texttemplate='%{text:,}'
-)
-st.plotly_chart(fig_bar_countries, use_container_width=True)
-
-
-# create a horizontal bar chart showing the distribution of participants by Category
-cat_dist = df['Category'].value_counts().sort_values(ascending=True)
-fig_bar_cat = px.bar(cat_dist.reset_index(),
-                        x='count',
-                        y='Category',
-                        title='Number of Participants by Age Category',
-                        color_discrete_sequence=['darkorange'],
-                        orientation='h')
-fig_bar_cat.update_layout(
-    title_font_size=24,
-    font=dict(size=14),
-    xaxis_title="Number of Participants",
-    yaxis_title="Category",
-    xaxis=dict(
-        tickfont=dict(size=16)
-    ),
-    yaxis=dict(
-        tickfont=dict(size=16)
-    )
-)
-fig_bar_cat.update_traces(
-    textposition='inside',
-    text=cat_dist,
-    texttemplate='%{text:,}'
-)
-st.plotly_chart(fig_bar_cat, use_container_width=True)
-
-
-
-
-# remove the DNF, Not started, UOF, and Started values from the Time column
-df['Time'] = df['Time'].str.replace('DNF', '', regex=False)
-df['Time'] = df['Time'].str.replace('Not started', '', regex=False)
-df['Time'] = df['Time'].str.replace('UOF', '', regex=False)
-df['Time'] = df['Time'].str.replace('Started', '', regex=False)
-df['Time'] = df['Time'].str.replace('DNS', '', regex=False)
-# convert the Time column to a timedelta
-df['Time'] = pd.to_timedelta(df['Time'], errors='coerce')
-
-
-# remove the DNF, Not started, UOF, and Started values from the Time column
-df['Net Time'] = df['Net Time'].str.replace('DNF', '', regex=False)
-df['Net Time'] = df['Net Time'].str.replace('Not started', '', regex=False)
-df['Net Time'] = df['Net Time'].str.replace('UOF', '', regex=False)
-df['Net Time'] = df['Net Time'].str.replace('Started', '', regex=False)
-df['Net Time'] = df['Net Time'].str.replace('DNS', '', regex=False)
-# convert the Time column to a timedelta
-df['Net Time'] = pd.to_timedelta(df['Net Time'], errors='coerce')
-
-
-#convert the 'Time' column to seconds for easier calculations
-df['Time (seconds)'] = df['Time'].dt.total_seconds()
-df['Fraction of Cut Off'] = df['Time (seconds)'] / (60 * 60 * 12)
-#convert the 'Time' column to minutes
-df['Time (minutes)'] = df['Time (seconds)'] / 60
-#convert the 'Time' column to hours
-df['Time (hours)'] = df['Time (minutes)'] / 60
-
-# split the 'Wave' column into two columns on the " - " delimiter
-df[['Batch Letter', 'Wave Number']] = df['Wave'].str.split(' - ', expand=True)
-
-
-def format_timedelta_without_days(td):
-    if pd.isna(td):
-        return ""
-    total_seconds = td.total_seconds()
-    hours, remainder = divmod(total_seconds, 3600)
-    minutes, seconds = divmod(remainder, 60)
-    return f"{hours:02.0f}:{minutes:02.0f}:{seconds:02.0f}"
-
-# Apply the formatting function to the 'Time' column
-df['TimeFormatted'] = df['Time'].apply(format_timedelta_without_days)
-
-
-
-
-# Create strip plot with Plotly Express
-fig2 = px.strip(df.sort_values(by='Wave'), 
-               y='Time (hours)',
-               title='Distribution of Finish Times at Comrades Marathon 2025 by Group',
-               template='simple_white',
-               x='Batch Letter',  # Color by Wave Number
-                color='Wave Number',  # Use Wave Number for x-axis
-               hover_data=['Name', 'Country', 'Category', 'TimeFormatted'],  # Add hover data
-               color_discrete_sequence=px.colors.qualitative.Set2  # Changed to bolder Set1 colors
-               )
-
-fig2.update_layout(
-    title_font_size=24,
-    yaxis={'autorange': 'reversed',
-           'ticksuffix': ' hours'},  # Add 'hours' suffix to y-axis labels
-    showlegend=True,
-    xaxis_title="Batch", 
-    xaxis_showticklabels=True,
-    yaxis_showticklabels=True,
-    height=900,
-    font=dict(size=14),  # Increase general font size
-    legend=dict(
-        font=dict(size=20),  # Increased legend font size
-        itemsizing='constant',  # Make legend items consistent size
-        itemwidth=30  # Increase width of legend items
-    )
-)
+# A fragment reruns without the rest of the script, so every fragment loads the
+# frame and its derived objects itself: anything kept from the last full run
+# would belong to an older version of the file once live results come in.
+
+# the figures don't depend on the selected participant, so they are built once
+# per dataset version and render mode and shared by every rerun and session.
+# ``source`` maps the frame of the version a figure is cached under to what it is drawn from
+def cached_figure(profiler, build, source, *args):
+    with profiler.stage(f'figure: {build.__name__}'):
+        return catalog.load_derived(edition, (build.__name__,) + args, lambda frame: build(source(frame), *args))
 
-fig2.update_traces(
-    jitter=1,
-    marker=dict(
-        size=3,
-        opacity=0.3
-    )
-)
-
-fig2.add_hline(y=6, line=dict(color='black', width=0.6, dash='dash'),
-              annotation_text='Wally Hayward Cut-Off ', annotation_position='bottom right')
-fig2.add_hline(y=7, line=dict(color='black', width=0.6, dash='dash'),
-              annotation_text='Isavel Roche-Kelly Cut-Off ', annotation_position='bottom right')
-fig2.add_hline(y=7.5, line=dict(color='black', width=0.6, dash='dash'),
-              annotation_text='Silver Cut-Off ', annotation_position='bottom right')
-fig2.add_hline(y=9, line=dict(color='black', width=0.6, dash='dash'),
-              annotation_text='Bill Rowan Cut-Off ', annotation_position='bottom right')
-fig2.add_hline(y=10, line=dict(color='black', width=0.6, dash='dash'),
-              annotation_text='Robert Mtshali Cut-Off ', annotation_position='bottom right')
-fig2.add_hline(y=11, line=dict(color='black', width=0.6, dash='dash'),
-              annotation_text='Bronze Cut-Off ', annotation_position='bottom right')
-fig2.add_hline(y=12, line=dict(color='black', width=0.6, dash='dash'),
-              annotation_text='Vic Clapham Cut-Off ', annotation_position='bottom right')
-
-fig2.update_traces(
-    jitter=1,
-    marker=dict(
-        size=3,
-        opacity=0.3
-    )
-)
-
-st.plotly_chart(fig2, use_container_width=True)
-
-
-# add a selectbox to choose the participant
-participant = st.selectbox('Select a participant:', list(df['Name'].unique()))
-
-# display the participant's details
-participant_details = df[df['Name'] == participant].iloc[0]
-
-# Create strip plot with Plotly Express
-fig = px.strip(df, 
-               y='Time (hours)',
-               title='Overall Distribution of Finish Times at Comrades Marathon 2025',
-               hover_data=['Name', 'Country', 'Category', 'TimeFormatted'],
-               template='simple_white'
-               )
-
-fig.update_layout(
-    title_font_size=24,
-    yaxis={'autorange': 'reversed',
-           'ticksuffix': ' hours'},  # Add 'hours' suffix to y-axis labels
-    showlegend=False,
-    xaxis_title="Time (hours)",
-    yaxis_showticklabels=True,
-    height=900,
-    font=dict(size=14),  # Increase general font size
-)
-
-fig.update_traces(
-    jitter=1,
-    marker=dict(
-        size=3,
-        opacity=0.3
-    ),
-    text=df['Name']
-    )
 
+def results(frame):
+    return frame
 
-fig.add_hline(y=6, line=dict(color='black', width=0.6, dash='dash'),
-              annotation_text='Wally Hayward Cut-Off ', annotation_position='bottom right')
-fig.add_hline(y=7, line=dict(color='black', width=0.6, dash='dash'),
-              annotation_text='Isavel Roche-Kelly Cut-Off ', annotation_position='bottom right')
-fig.add_hline(y=7.5, line=dict(color='black', width=0.6, dash='dash'),
-              annotation_text='Silver Cut-Off ', annotation_position='bottom right')
-fig.add_hline(y=9, line=dict(color='black', width=0.6, dash='dash'),
-              annotation_text='Bill Rowan Cut-Off ', annotation_position='bottom right')
-fig.add_hline(y=10, line=dict(color='black', width=0.6, dash='dash'),
-              annotation_text='Robert Mtshali Cut-Off ', annotation_position='bottom right')
-fig.add_hline(y=11, line=dict(color='black', width=0.6, dash='dash'),
-              annotation_text='Bronze Cut-Off ', annotation_position='bottom right')
-fig.add_hline(y=12, line=dict(color='black', width=0.6, dash='dash'),
-              annotation_text='Vic Clapham Cut-Off ', annotation_position='bottom right')
 
+# group counts for the bar charts, from one groupby pass per dataset version
+def rollups(frame):
+    return catalog.load_derived(edition, 'rollups', Rollups)
 
-if participant_details['Time (hours)'] is not pd.NaT:
-    fig.add_hline(y=participant_details['Time (hours)'], 
-                  line=dict(color='orange', width=3, dash='solid'),
-                  annotation_text=f'{participant_details["Name"].upper()}', 
-                  annotation_position='top left',
-                  annotation=dict(font=dict(size=18)))
 
+# every runner's cut-off band and the band counts per wave, category and gender, one pass per dataset version
+def cut_off_bands(frame):
+    return catalog.load_derived(edition, 'cut_off_bands', CutOffBands)
 
-st.plotly_chart(fig, use_container_width=True)
+
+def show_timings(profiler, title):
+    # a fragment can't write to the sidebar, so its timings are shown in place
+    profiler.finish()
+    if profiler.enabled:
+        with st.expander(f'Stage timings: {title}'):
+            st.dataframe(profiler.table(), hide_index=True)
+
+
+def stat_card(label, value):
+    st.markdown(
+        f"""
+        <div style="text-align: center; border: 2px solid #ccc; border-radius: 10px; padding: 20px; margin: 10px">
+            <h3>{label}</h3>
+            <h1 style="font-size: 40px">{value}</h1>
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
+
+
+COHORT_VIEWS = ['Finished near', 'Nearest finishers', 'Club in same wave', 'Cut-off bus']
+
+
+def cohort_panel(profiler, df, row):
+    # who ran around the participant, from the time-sorted and per club and wave indexes instead of masks
+    with profiler.stage('cohorts'):
+        cohorts = catalog.load_derived(edition, 'cohorts', Cohorts)
+    st.subheader('Runners around')
+    view = st.radio('Runners around', COHORT_VIEWS, horizontal=True, label_visibility='collapsed')
+    seconds = cohorts.seconds[row]
+    if view == 'Club in same wave':
+        rows = cohorts.club_mates(row)
+        caption = f'{len(rows):,} club mates in wave {df["Wave"].iat[row]}'
+    elif view == 'Cut-off bus':
+        cut_off = st.selectbox('Cut-off', CUT_OFFS, index=3, format_func=lambda cut_off: cut_off.label)
+        minutes = st.slider('Minutes before the cut-off', 1, 30, 10)
+        # the runners who made the cut-off with less than the chosen minutes to spare
+        seconds = cut_off.hours * 3600
+        rows = cohorts.window(seconds - minutes * 60 + 1, seconds)
+        spread = cohorts.spread(rows)
+        caption = f'{len(rows):,} runners made the {cut_off.label} in its last {minutes} minutes'
+        if len(rows):
+            caption += f', the median {format_seconds([seconds - spread["median"]])[0]} inside it'
+    elif np.isnan(seconds):
+        st.info('This participant has no finish time.')
+        return
+    elif view == 'Finished near':
+        minutes = st.slider('Within minutes', 1, 15, 2)
+        rows = cohorts.around(row, minutes * 60)
+        caption = f'{len(rows):,} runners finished within {minutes} minutes'
+    else:
+        rows = cohorts.nearest(row, st.slider('Runners', 5, 50, 10))
+        caption = f'The {len(rows)} finishers closest in time'
+
+    with profiler.stage('cohort table'):
+        table = cohorts.table(df, rows, seconds)
+        clubs = cohorts.club_counts(rows).head(10)
+    st.caption(caption)
+    col1, col2 = st.columns([3, 1])
+    col1.dataframe(table, hide_index=True, height=300)
+    col2.dataframe(clubs, height=300)
+
+
+# searching and picking a participant only reruns this section, the rest of the page is left as it is
+@st.fragment
+def participant_section():
+    profiler = Profiler(enabled=profile, trace_memory=trace_memory, scope='participant')
+    with profiler.stage('load results'):
+        df = catalog.load(edition)
+
+    # search the prebuilt index and only send the best matches to the selectbox
+    with profiler.stage('participant index'):
+        participant_index = catalog.load_derived(edition, 'participant_index', ParticipantIndex)
+    query = st.text_input('Search for a participant:', placeholder='Name or race number')
+    with profiler.stage('search'):
+        matches = participant_index.search(query, limit=20)
+    race_numbers = [int(participant_index.race_numbers[row]) for row in matches]
+    race_no = st.selectbox('Select a participant:', race_numbers,
+                           format_func=lambda n: f"{df['Name'].iat[participant_index.lookup(n)]} (#{n})")
+
+    # sorted finish times per slice, so a participant's standing is a binary search
+    with profiler.stage('rankings'):
+        rankings = catalog.load_derived(edition, 'rankings', Rankings)
+
+    fig = cached_figure(profiler, overall_strip_figure, results, render_mode,
+                        f'Overall Distribution of Finish Times at Comrades Marathon {year}')
+    if race_no is None:
+        st.info('No participants match that search.')
+    else:
+        # display the participant's details
+        row = participant_index.lookup(race_no)
+        participant_details = df.iloc[row]
+        overall = rankings.row_standing(row)
+        if overall is None:
+            stat_card('Status', participant_details['Status'])
+        else:
+            in_category = rankings.row_standing(row, by='Category')
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                stat_card('Time', format_seconds([participant_details['Time (seconds)']])[0])
+                st.caption(f'Under the {cut_off_bands(df).band(row)} cut-off')
+                profiler.plotly_chart(st, 'cut-off gauge',
+                                      performance_gauge(participant_details['Time (seconds)'] / CUT_OFF_SECONDS,
+                                                        'Fraction of Cut-Off'),
+                                      use_container_width=True, key='gauge_cut_off')
+            with col2:
+                stat_card('Position', participant_details['Pos'])
+                profiler.plotly_chart(st, 'overall gauge', performance_gauge(overall.percentile, 'Overall Percentile'),
+                                      use_container_width=True, key='gauge_overall')
+                st.caption(f'Finished ahead of {overall.beaten:,} of {overall.entrants:,} entrants')
+            with col3:
+                stat_card('Category Position', participant_details['Cat Pos'])
+                # ranked among their category and gender, like Cat Pos
+                category = f'{participant_details["Category"]} {participant_details["Gender"]}'
+                profiler.plotly_chart(st, 'category gauge',
+                                      performance_gauge(in_category.percentile, f'{category} Percentile'),
+                                      use_container_width=True, key='gauge_category')
+                st.caption(f'Finished ahead of {in_category.beaten:,} of {in_category.entrants:,} '
+                           f'{category} entrants')
+        cohort_panel(profiler, df, row)
+
+        with profiler.stage('participant overlay'):
+            fig = participant_figure(fig, participant_details)
+
+        # the runner's other editions come from the catalog's runner index, no other partition is loaded.
+        # In this edition it is their own row, not everyone sharing the name
+        if len(catalog) > 1:
+            with profiler.stage('race history'):
+                history = catalog.runner_index().history(name=participant_details['Name'], edition=edition, row=row)
+            if len(history) > 1:
+                st.subheader('Race history')
+                st.dataframe(history[['Year', 'Race', 'Race No', 'Status', 'Time', 'Pos']], hide_index=True)
+    profiler.plotly_chart(st, 'overall strip', fig, use_container_width=True)
+    show_timings(profiler, 'participant')
+
+
+def cut_off_breakdown(profiler):
+    by = st.radio('Cut-off bands by', BREAKDOWNS, horizontal=True)
+    return cached_figure(profiler, cut_off_band_figure, cut_off_bands, by)
+
+
+# the charts of the whole field, only the one picked is built and sent to the browser
+OVERVIEW_CHARTS = {
+    'Status': lambda profiler: cached_figure(profiler, status_bar_figure, rollups),
+    'Countries': lambda profiler: cached_figure(profiler, country_bar_figure, rollups),
+    'Categories': lambda profiler: cached_figure(profiler, category_bar_figure, rollups),
+    'Waves': lambda profiler: cached_figure(profiler, wave_strip_figure, results, render_mode,
+                                            f'Distribution of Finish Times at Comrades Marathon {year} by Group'),
+    'Cut-off bands': cut_off_breakdown,
+}
+
+
+@st.fragment
+def field_overview():
+    profiler = Profiler(enabled=profile, trace_memory=trace_memory, scope='overview')
+    chart = st.radio('Field overview', list(OVERVIEW_CHARTS), horizontal=True, label_visibility='collapsed')
+    profiler.plotly_chart(st, chart.lower(), OVERVIEW_CHARTS[chart](profiler), use_container_width=True)
+    show_timings(profiler, 'field overview')
+
+
+participant_section()
+st.subheader('The field')
+field_overview()
 
 # Create a footer saying "Created by [Your Name]"
 st.markdown("---")
-st.markdown("Created by Darren Conyngham")
\ No newline at end of file
+st.markdown("Created by Darren Conyngham")
+
+profiler.finish()
+if profiler.enabled:
+    st.sidebar.dataframe(profiler.table(), hide_index=True)
\ No newline at end of file
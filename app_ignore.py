@@ -6,6 +6,10 @@ import plotly.express as px
 import streamlit as st
 import plotly.graph_objects as go
 
+from cut_offs import CUT_OFFS
+from rankings import SLICES, Rankings
+from time_parsing import format_seconds, parse_times, status_labels
+
 df = pd.read_csv('comrades_2025_results.csv')
 
 
@@ -18,66 +22,27 @@ df['Gen Pos'] = df['Gen Pos'].astype('Int32')
 # create a new column for the percentile of the participant's position
 # df['Percentile'] = df['Pos'].rank(pct=True, ascending=True)
 
-# creat a new column indicating the fraction of participants that the participant beat
-df['Percentile Pos'] = df['Pos'] / len(df)
-
-# Group by 'Category' and calculate category size, then merge back to get category counts
-category_sizes = df.groupby('Category').size().reset_index(name='category_size')
-df = df.merge(category_sizes, on='Category', how='left')
-
-# Calculate percentile within category
-df['Percentile Cat Pos'] = df['Cat Pos'] / df['category_size']
-
-df['Fraction Beaten'] = 1 - ((df['Pos'] - 1) / (len(df) - 1))
-
-# create a new column for the percentile of the participant's category position
-# df['Cat Percentile'] = df['Cat Pos'].rank(pct=True, ascending=False)
-
-# convert the values of DNF, Not started, UOF, Started in the time column to their own boolean columns
-df['DNF'] = df['Time'].str.contains('DNF')
-df['Not started'] = df['Time'].str.contains('Not started')
-df['UOF'] = df['Time'].str.contains('UOF')
-df['Started'] = df['Time'].str.contains('Started') 
-df['DNS'] = df['Time'].str.contains('DNS') 
-
-# remove the DNF, Not started, UOF, and Started values from the Time column
-df['Time'] = df['Time'].str.replace('DNF', '', regex=False)
-df['Time'] = df['Time'].str.replace('Not started', '', regex=False)
-df['Time'] = df['Time'].str.replace('UOF', '', regex=False)
-df['Time'] = df['Time'].str.replace('Started', '', regex=False)
-df['Time'] = df['Time'].str.replace('DNS', '', regex=False)
-# convert the Time column to a timedelta
-df['Time'] = pd.to_timedelta(df['Time'], errors='coerce')
-
-
-# remove the DNF, Not started, UOF, and Started values from the Time column
-df['Net Time'] = df['Net Time'].str.replace('DNF', '', regex=False)
-df['Net Time'] = df['Net Time'].str.replace('Not started', '', regex=False)
-df['Net Time'] = df['Net Time'].str.replace('UOF', '', regex=False)
-df['Net Time'] = df['Net Time'].str.replace('Started', '', regex=False)
-df['Net Time'] = df['Net Time'].str.replace('DNS', '', regex=False)
-# convert the Time column to a timedelta
-df['Net Time'] = pd.to_timedelta(df['Net Time'], errors='coerce')
+# split the Time and Net Time columns into a status code and the time in seconds
+status, seconds = parse_times(df['Time'])
+_, net_seconds = parse_times(df['Net Time'])
+df['Status'] = status_labels(status)
+df['Time'] = pd.to_timedelta(seconds, unit='s')
+df['Net Time'] = pd.to_timedelta(net_seconds, unit='s')
 
 
 #convert the 'Time' column to seconds for easier calculations
-df['Time (seconds)'] = df['Time'].dt.total_seconds()
+df['Time (seconds)'] = seconds
 df['Fraction of Cut Off'] = df['Time (seconds)'] / (60 * 60 * 12)
 #convert the 'Time' column to minutes
 df['Time (minutes)'] = df['Time (seconds)'] / 60
 #convert the 'Time' column to hours
 df['Time (hours)'] = df['Time (minutes)'] / 60
 
-def format_timedelta_without_days(td):
-    if pd.isna(td):
-        return ""
-    total_seconds = td.total_seconds()
-    hours, remainder = divmod(total_seconds, 3600)
-    minutes, seconds = divmod(remainder, 60)
-    return f"{hours:02.0f}:{minutes:02.0f}:{seconds:02.0f}"
+df['TimeFormatted'] = format_seconds(seconds)
 
-# Apply the formatting function to the 'Time' column
-df['TimeFormatted'] = df['Time'].apply(format_timedelta_without_days)
+# sorted finish times overall and per category, the selected participant's
+# percentiles are looked up below instead of computed as columns for every row
+rankings = Rankings(df, slices={'Category': SLICES['Category']})
 
 
 st.title('Comrades 2025 Results Analysis')
@@ -88,7 +53,10 @@ participant = st.selectbox('Select a participant:', df['Name'].unique())
 
 
 # display the participant's details
-participant_details = df[df['Name'] == participant].iloc[0]
+participant_row = int(np.flatnonzero(df['Name'] == participant)[0])
+participant_details = df.iloc[participant_row]
+overall_standing = rankings.row_standing(participant_row)
+category_standing = rankings.row_standing(participant_row, by='Category')
 # st.write(f"**Country:** {participant_details['Country']}")
 # st.write(f"**Position:** {participant_details['Pos']}")
 # st.write(f"**Category Position:** {participant_details['Cat Pos']}")
@@ -108,11 +76,13 @@ try:
 except: 
     pass # If the flag URL is not valid, we can skip displaying it
 
-def display_gauge_chart(col):
+def display_gauge_chart(fraction, key):
     # Create a gauge chart showing the participant's percentile
+    if fraction is None or pd.isna(fraction):
+        return
     fig_gauge = go.Figure(go.Indicator(
         mode = "gauge+number",
-        value = participant_details[col] * 100,
+        value = fraction * 100,
         number = {'valueformat': '.2f', 'suffix': '%'},  # Added suffix for percentage symbol
         title = {'text': "Overall Performance Percentile"},
         
@@ -127,7 +97,7 @@ def display_gauge_chart(col):
         }
     ))
 
-    st.plotly_chart(fig_gauge, use_container_width=True, key=col)
+    st.plotly_chart(fig_gauge, use_container_width=True, key=key)
 
 
 col1, col2, col3 = st.columns(3)
@@ -142,7 +112,7 @@ with col1:
         """, 
         unsafe_allow_html=True
     )
-    display_gauge_chart('Fraction of Cut Off')
+    display_gauge_chart(participant_details['Fraction of Cut Off'], 'Fraction of Cut Off')
     
 with col2:
     st.markdown(
@@ -154,7 +124,7 @@ with col2:
         """,
         unsafe_allow_html=True
     )
-    display_gauge_chart('Percentile Pos')
+    display_gauge_chart(overall_standing and overall_standing.percentile, 'Percentile Pos')
 
 with col3:
     st.markdown(
@@ -166,7 +136,7 @@ with col3:
         """,
         unsafe_allow_html=True
     )
-    display_gauge_chart('Percentile Cat Pos')
+    display_gauge_chart(category_standing and category_standing.percentile, 'Percentile Cat Pos')
 
 
 # Create scatter plot with Plotly Express
@@ -188,20 +158,9 @@ fig.update_traces(
 )
 
 
-fig.add_vline(x=6, line=dict(color='black', width=0.6, dash='dash'),
-              annotation_text='Wally Hayward Cut-Off ', annotation_position='bottom left')
-fig.add_vline(x=7, line=dict(color='black', width=0.6, dash='dash'),
-              annotation_text='Isavel Roche-Kelly Cut-Off ', annotation_position='bottom left')
-fig.add_vline(x=7.5, line=dict(color='black', width=0.6, dash='dash'),
-              annotation_text='Silver Cut-Off ', annotation_position='bottom left')
-fig.add_vline(x=9, line=dict(color='black', width=0.6, dash='dash'),
-              annotation_text='Bill Rowan Cut-Off ', annotation_position='bottom left')
-fig.add_vline(x=10, line=dict(color='black', width=0.6, dash='dash'),
-              annotation_text='Robert Mtshali Cut-Off ', annotation_position='bottom left')
-fig.add_vline(x=11, line=dict(color='black', width=0.6, dash='dash'),
-              annotation_text='Bronze Cut-Off ', annotation_position='bottom left')
-fig.add_vline(x=12, line=dict(color='black', width=0.6, dash='dash'),
-              annotation_text='Vic Clapham Cut-Off ', annotation_position='bottom left')
+for cut_off in CUT_OFFS:
+    fig.add_vline(x=cut_off.hours, line=dict(color='black', width=0.6, dash='dash'),
+                  annotation_text=f'{cut_off.label} ', annotation_position='bottom left')
 
 # Add vertical lines for hour markers
 # for i in range(5, 13):
@@ -0,0 +1,82 @@
+"""Rows/second of results_parser against the notebook's extract_table_data.
+
+The notebook function is loaded straight from ``scraper.ipynb`` so the
+comparison is always against the code that produced the original CSV. Pages
+are read from a directory of saved ``page_NNNN.html`` files, or rendered from
+the results CSV by ``fixture_server`` when no directory is given.
+
+    python -m benchmarks.bench_extract
+    python -m benchmarks.bench_extract --pages-dir saved_pages --repeat 5
+"""
+import argparse
+import contextlib
+import io
+import json
+import time
+
+import pandas as pd
+from bs4 import BeautifulSoup
+
+from fixture_server import FixtureSite
+from results_parser import TABLE_CLASS, parse_results_page
+
+
+def load_notebook_function(path='scraper.ipynb', name='extract_table_data'):
+    with open(path, encoding='utf-8') as f:
+        notebook = json.load(f)
+    for cell in notebook['cells']:
+        source = ''.join(cell['source'])
+        if cell['cell_type'] == 'code' and f'def {name}(' in source:
+            namespace = {'pd': pd, 'BeautifulSoup': BeautifulSoup}
+            exec(source, namespace)
+            return namespace[name]
+    raise LookupError(f'{name} not found in {path}')
+
+
+def legacy_parse(extract_table_data, html):
+    # what the notebook's scrape loop did for every page
+    soup = BeautifulSoup(html, 'html.parser')
+    table = soup.find('table', class_=TABLE_CLASS)
+    if not table:
+        return []
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = extract_table_data(table)
+    return [] if df is None else df.values.tolist()
+
+
+def rows_per_second(parse, pages, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = sum(len(parse(html)) for html in pages)
+        best = min(best, time.perf_counter() - start)
+    return rows, rows / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages-dir', help='directory of saved page_NNNN.html files')
+    parser.add_argument('--csv', default='comrades_2025_results.csv',
+                        help='results CSV to render pages from when --pages-dir is not given')
+    parser.add_argument('--pages', type=int, default=50, help='number of pages to parse')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    site = FixtureSite.from_directory(args.pages_dir) if args.pages_dir else FixtureSite.from_csv(args.csv)
+    pages = [site.pages[page] for page in sorted(site.pages)[:args.pages]]
+
+    extract_table_data = load_notebook_function()
+    legacy = lambda html: legacy_parse(extract_table_data, html)
+    for html in pages:
+        if legacy(html) != parse_results_page(html):
+            raise AssertionError('results_parser and extract_table_data disagree')
+
+    rows, legacy_rate = rows_per_second(legacy, pages, args.repeat)
+    _, fast_rate = rows_per_second(parse_results_page, pages, args.repeat)
+    print(f'{len(pages)} pages, {rows:,} rows')
+    print(f'extract_table_data: {legacy_rate:>10,.0f} rows/s')
+    print(f'results_parser:     {fast_rate:>10,.0f} rows/s  ({fast_rate / legacy_rate:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
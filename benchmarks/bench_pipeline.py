@@ -0,0 +1,193 @@
+"""Time and memory-profile each stage of the app's data pipeline on synthetic fields.
+
+For every field size a synthetic results CSV (see ``benchmarks.synthetic``)
+is written to a temporary directory and run through the stages ``app.py``
+depends on:
+
+* ``load (cold)``: ``results_store.load_frame`` of a CSV it hasn't seen, which
+  hashes it and compiles the Arrow artifact, like the app's first load
+* ``load (warm)``: ``load_frame`` again, from the up to date artifact, like
+  every later load
+* ``csv parse``: ``pd.read_csv``, the start of the stages below
+* ``status parsing``: ``parse_times`` of ``Time`` and ``Net Time``
+* ``timedelta conversion``: seconds to ``Timedelta``, as the app used to store them
+* ``formatting``: ``format_seconds``
+* ``prepare``: the whole of ``results_store.prepare_results``
+* ``figure build``: the overall and per-wave strip plots in ``'auto'`` mode
+* ``figure json``: serializing those figures, the payload sent to the browser
+
+Each stage is timed (best of ``--repeat``) and run once more under
+``tracemalloc`` for its peak allocation. The results are written as JSON.
+When a ``--baseline`` file is given, every stage more than ``--tolerance``
+times slower than its baseline is reported and the exit status is 1.
+
+    python -m benchmarks.bench_pipeline
+    python -m benchmarks.bench_pipeline --rows 22686 100000 1000000 10000000 --repeat 1
+    python -m benchmarks.bench_pipeline -o new.json --baseline old.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import plotly
+import plotly.io as pio
+
+from benchmarks.synthetic import SIZES, write_synthetic_csv
+from charts import choose_render_mode, overall_strip_figure, wave_strip_figure
+from results_store import artifact_path, forget_version, load_frame, prepare_results
+from time_parsing import format_seconds, parse_times
+
+
+def _stages(csv_path):
+    # (name, function) pairs, each function takes the previous stage's state
+    def load_cold(state):
+        if os.path.exists(artifact_path(csv_path)):
+            os.remove(artifact_path(csv_path))
+        forget_version(csv_path)
+        load_frame(csv_path)
+
+    def load_warm(state):
+        load_frame(csv_path)
+
+    def csv_parse(state):
+        state['raw'] = pd.read_csv(csv_path)
+
+    def status_parsing(state):
+        state['status'], state['seconds'] = parse_times(state['raw']['Time'])
+        _, state['net_seconds'] = parse_times(state['raw']['Net Time'])
+
+    def timedelta_conversion(state):
+        pd.to_timedelta(state['seconds'], unit='s')
+        pd.to_timedelta(state['net_seconds'], unit='s')
+
+    def formatting(state):
+        format_seconds(state['seconds'])
+
+    def prepare(state):
+        state['df'] = prepare_results(state['raw'].copy())
+
+    def figure_build(state):
+        state['figures'] = [overall_strip_figure(state['df']), wave_strip_figure(state['df'])]
+
+    def figure_json(state):
+        state['payload_bytes'] = sum(len(pio.to_json(fig, validate=False)) for fig in state['figures'])
+
+    return [('load (cold)', load_cold), ('load (warm)', load_warm), ('csv parse', csv_parse),
+            ('status parsing', status_parsing), ('timedelta conversion', timedelta_conversion),
+            ('formatting', formatting), ('prepare', prepare), ('figure build', figure_build),
+            ('figure json', figure_json)]
+
+
+def run_stage(func, state, repeat):
+    """Return (best wall seconds, peak traced bytes) of ``func(state)``."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(state)
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func(state)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(timings), peak
+
+
+def bench_size(rows, repeat, directory, seed=0):
+    csv_path = os.path.join(directory, f'synthetic_{rows}.csv')
+    write_synthetic_csv(csv_path, rows, seed)
+    csv_bytes = os.path.getsize(csv_path)
+
+    state = {}
+    results = []
+    for stage, func in _stages(csv_path):
+        seconds, peak = run_stage(func, state, repeat)
+        result = {'rows': rows, 'stage': stage, 'seconds': round(seconds, 6), 'peak_bytes': peak}
+        if stage == 'load (cold)':
+            result['csv_bytes'] = csv_bytes
+        elif stage == 'load (warm)':
+            result['artifact_bytes'] = os.path.getsize(artifact_path(csv_path))
+        elif stage == 'figure build':
+            finishers = int(state['df']['Time (seconds)'].notna().sum())
+            result['render_mode'] = choose_render_mode(finishers)
+        elif stage == 'figure json':
+            result['payload_bytes'] = state['payload_bytes']
+        results.append(result)
+        print(f'{rows:>12,}  {stage:<22} {seconds:>9.3f} s  {peak / 1e6:>9.1f} MB peak', flush=True)
+    os.remove(csv_path)
+    os.remove(artifact_path(csv_path))
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'plotly': plotly.__version__,
+    }
+
+
+def regressions(results, baseline, tolerance):
+    """Return ``(result, baseline seconds)`` for every stage slower than ``tolerance`` times its baseline."""
+    before = {(r['rows'], r['stage']): r['seconds'] for r in baseline['results']}
+    slower = []
+    for result in results:
+        old = before.get((result['rows'], result['stage']))
+        if old and result['seconds'] > old * tolerance:
+            slower.append((result, old))
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=SIZES[:3],
+                        help=f'field sizes to run (default: {" ".join(map(str, SIZES[:3]))}, '
+                             f'add {SIZES[3]} for the full suite)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', default='bench_pipeline.json', help='where to write the JSON results')
+    parser.add_argument('--baseline', help='earlier results to compare against')
+    parser.add_argument('--tolerance', type=float, default=1.25,
+                        help='slowdown factor over the baseline that counts as a regression')
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in args.rows:
+            results.extend(bench_size(rows, args.repeat, directory, args.seed))
+
+    with open(args.output, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=1)
+    print(f'Wrote {args.output}')
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            slower = regressions(results, json.load(f), args.tolerance)
+        for result, old in slower:
+            print(f"regression: {result['stage']} at {result['rows']:,} rows "
+                  f"{old:.3f} s -> {result['seconds']:.3f} s ({result['seconds'] / old:.2f}x)")
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Compare the old chained str.contains/str.replace time parsing with time_parsing.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_time_parsing
+    python -m benchmarks.bench_time_parsing --rows 22686 1000000 --repeat 5
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from time_parsing import format_seconds, parse_times
+
+STATUSES = ['DNF', 'Not started', 'UOF', 'Started', 'DNS']
+
+
+def format_timedelta_without_days(td):
+    if pd.isna(td):
+        return ""
+    total_seconds = td.total_seconds()
+    hours, remainder = divmod(total_seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{hours:02.0f}:{minutes:02.0f}:{seconds:02.0f}"
+
+
+def legacy_pipeline(df):
+    # the pipeline app.py used before time_parsing existed
+    flags = [df['Time'].str.contains(status) for status in STATUSES]
+    status = np.select(flags, ['Did Not Finish', 'Not started', 'Unofficial Finisher', 'Started', 'Did Not Start'],
+                       default='Finished')
+    times = {}
+    for col in ['Time', 'Net Time']:
+        values = df[col]
+        for token in STATUSES:
+            values = values.str.replace(token, '', regex=False)
+        times[col] = pd.to_timedelta(values, errors='coerce')
+    formatted = times['Time'].apply(format_timedelta_without_days)
+    return status, times, formatted
+
+
+def vectorized_pipeline(df):
+    status, seconds = parse_times(df['Time'])
+    _, net_seconds = parse_times(df['Net Time'])
+    formatted = format_seconds(seconds)
+    return status, seconds, net_seconds, formatted
+
+
+def make_frame(source, rows, seed=0):
+    # resample real Time/Net Time pairs so the status mix matches the race
+    if rows == len(source):
+        return source
+    idx = np.random.default_rng(seed).integers(0, len(source), rows)
+    return source.iloc[idx].reset_index(drop=True)
+
+
+def best_of(func, df, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(df)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--csv', default='comrades_2025_results.csv')
+    parser.add_argument('--rows', type=int, nargs='+', default=None,
+                        help='row counts to time (default: the real file and 1,000,000)')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    source = pd.read_csv(args.csv, usecols=['Time', 'Net Time'])
+    rows = args.rows or [len(source), 1_000_000]
+
+    print(f"{'rows':>10}  {'legacy (s)':>11}  {'vectorized (s)':>14}  {'speedup':>8}")
+    for n in rows:
+        df = make_frame(source, n)
+        legacy = best_of(legacy_pipeline, df, args.repeat)
+        vectorized = best_of(vectorized_pipeline, df, args.repeat)
+        print(f'{n:>10,}  {legacy:>11.3f}  {vectorized:>14.3f}  {legacy / vectorized:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""Replay a race through the live pipeline and check incremental updates against fresh builds.
+
+A ``fixture_server.RaceDaySite`` serves the results CSV as it would have
+looked during the race, on a clock this script moves forward ``--step``
+minutes at a time. After every step ``live_ingest.poll`` fetches the pages,
+the results CSV is rewritten and ``results_loader`` moves the rollups and
+rankings by the rows that changed (``results_store.diff_results``,
+``Rollups.updated``, ``Rankings.updated``). Each step the updated objects are
+compared with ones built from scratch for the same file.
+
+After the race has closed, a round of corrections follows: finishers moved
+onto other finishers' times (duplicate times have to leave the sorted
+arrays one copy at a time) and finish times struck out.
+
+The exit status is 1 if anything differs, or if the replay doesn't end on the
+original results.
+
+    python -m benchmarks.live_replay
+    python -m benchmarks.live_replay --start-hours 5.5 --step 20
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import results_loader
+from fixture_server import RaceDaySite, serve
+from live_ingest import LiveResults, poll
+from rankings import Rankings
+from results_parser import HEADERS
+from rollups import Rollups
+from scraper import TokenBucket, make_session
+
+DERIVED = {'rollups': Rollups, 'rankings': Rankings}
+
+
+def compare_rollups(updated, fresh):
+    """Return the differences between two ``Rollups``, an empty list if they agree."""
+    problems = []
+    if (updated.total, updated.finishers) != (fresh.total, fresh.finishers):
+        problems.append(f'totals {updated.total}/{updated.finishers} != {fresh.total}/{fresh.finishers}')
+    for dimension in fresh.dimensions:
+        a, b = updated.table(dimension).sort_index(), fresh.table(dimension).sort_index()
+        try:
+            pd.testing.assert_frame_equal(a, b, check_index_type=False, check_categorical=False)
+        except AssertionError:
+            problems.append(f'rollups table {dimension}')
+    return problems
+
+
+def compare_rankings(updated, fresh, rows):
+    """Return the differences between two ``Rankings``, checking ``row_standing`` at ``rows``."""
+    problems = []
+    if updated.overall.entrants != fresh.overall.entrants or not np.array_equal(updated.overall.times,
+                                                                               fresh.overall.times):
+        problems.append('overall ranking')
+    for name, slices in fresh.slices.items():
+        if list(updated.slices[name]) != list(slices):
+            problems.append(f'{name} slice values')
+            continue
+        for value, expected in slices.items():
+            got = updated.slices[name][value]
+            if got.entrants != expected.entrants or not np.array_equal(got.times, expected.times):
+                problems.append(f'{name} slice {value}')
+        for row in rows:
+            if updated.row_standing(row, by=name) != fresh.row_standing(row, by=name):
+                problems.append(f'{name} standing of row {row}')
+                break
+    return problems
+
+
+def check_version(path, rng, label):
+    """Compare the loader's (updated) derived objects for ``path`` with fresh builds, returns the problems."""
+    entry = results_loader._get_entry(path)
+    incremental = sorted(entry.carried)
+    start = time.perf_counter()
+    derived = {name: results_loader.load_derived(name, build, path) for name, build in DERIVED.items()}
+    update_seconds = time.perf_counter() - start
+    frame = results_loader.load_results(path)
+    start = time.perf_counter()
+    fresh = {name: build(frame) for name, build in DERIVED.items()}
+    fresh_seconds = time.perf_counter() - start
+
+    rows = rng.choice(len(frame), min(len(frame), 500), replace=False)
+    problems = (compare_rollups(derived['rollups'], fresh['rollups'])
+                + compare_rankings(derived['rankings'], fresh['rankings'], rows))
+    finishers = int(np.isfinite(fresh['rankings'].seconds).sum())
+    how = f"updated {', '.join(incremental)}" if incremental else 'built'
+    print(f'{label:<28} {len(frame):>7,} rows {finishers:>7,} finishers  {how} in {update_seconds * 1000:>6.1f} ms, '
+          f'fresh {fresh_seconds * 1000:>6.1f} ms  {"ok" if not problems else "MISMATCH"}', flush=True)
+    for problem in problems:
+        print(f'  {problem}')
+    return problems
+
+
+def corrections(df, rng, count):
+    """Return the string results ``df`` after ``count`` corrections to finish times."""
+    df = df.copy()
+    finished = np.flatnonzero(df['Time'].str.match(r'^\d{2}:\d{2}:\d{2}$').to_numpy())
+    moved, struck = np.split(rng.choice(finished, 2 * count, replace=False), 2)
+    # onto the times of other finishers, so equal times pile up in the sorted arrays
+    df.iloc[moved, df.columns.get_loc('Time')] = df['Time'].to_numpy()[rng.choice(finished, count)]
+    df.iloc[struck, df.columns.get_loc('Time')] = 'DNF'
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--csv', default='comrades_2025_results.csv', help='results of the race to replay')
+    parser.add_argument('--start-hours', type=float, default=5.0, help='race time of the first poll')
+    parser.add_argument('--step', type=float, default=45.0, help='race minutes between polls')
+    parser.add_argument('--corrections', type=int, default=300, help='finish times corrected after the race')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    now = [args.start_hours * 3600]
+    site = RaceDaySite.from_csv(args.csv, clock=lambda: now[0])
+    server, base_url = serve(site)
+    session, bucket = make_session(8), TokenBucket(10_000, capacity=8)
+    original = pd.read_csv(args.csv, dtype=object, keep_default_na=False)[HEADERS]
+
+    problems = []
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, 'live_results.csv')
+        live = LiveResults()
+        try:
+            # until a poll after the last cut-off, when the pages show the final results
+            while True:
+                result = poll(live, site.pages, session, bucket, base_url=base_url, concurrency=8)
+                if result.inserted or result.updated:
+                    live.write_csv(output)
+                    problems += check_version(output, rng, f'race time {now[0] / 3600:5.2f} h')
+                if now[0] > 12 * 3600:
+                    break
+                now[0] += args.step * 60
+        finally:
+            server.shutdown()
+
+        final = pd.read_csv(output, dtype=object, keep_default_na=False)[HEADERS]
+        # row for row, in the same order
+        if not final.equals(original):
+            problems.append('the replay did not end on the original results')
+            print('MISMATCH: the replay did not end on the original results')
+
+        corrected = corrections(final, rng, args.corrections)
+        corrected.to_csv(output, index=False)
+        problems += check_version(output, rng, f'{args.corrections} corrections')
+        results_loader.clear_cache(output)
+
+    if problems:
+        print(f'{len(problems)} problems')
+        sys.exit(1)
+    print('Incremental updates matched fresh builds at every step')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""Load test the query API and report throughput and latency percentiles.
+
+``--concurrency`` client threads, each with its own keep-alive session, send
+a mix of the API's queries for ``--duration`` seconds (or ``--requests`` in
+total): participant searches for surnames and participant cards for race
+numbers drawn from the served edition, counts per rollup dimension and
+standings of random finish times. Requests per second and p50/p90/p99/max
+latency are reported per endpoint and overall and written as JSON.
+
+With ``--start-server`` the API is started with ``--workers`` processes for
+the run and stopped afterwards.
+
+    python query_api.py --workers 4 &
+    python -m benchmarks.load_test_api --concurrency 16 --duration 20
+    python -m benchmarks.load_test_api --start-server --workers 4 -o load_test_api.json
+"""
+import argparse
+import json
+import random
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+import requests
+
+from benchmarks.bench_pipeline import environment
+from rankings import SLICES
+from results_catalog import CATALOG_DIR, Catalog
+from rollups import DIMENSIONS
+from time_parsing import format_seconds
+
+# endpoint -> share of the requests, searches and cards are what other tools mostly ask for
+MIX = {'search': 0.4, 'participant': 0.4, 'counts': 0.1, 'standing': 0.1}
+
+
+def request_mix(df, count, seed=0):
+    """Return ``count`` ``(endpoint, path)`` pairs drawn from the results ``df``."""
+    rng = random.Random(seed)
+    surnames = df['Name'].dropna().str.split().str[-1].tolist()
+    race_numbers = df['Race No'].tolist()
+    slice_values = {name: df[columns].dropna().drop_duplicates().to_numpy().tolist()
+                    for name, columns in SLICES.items()}
+    times = format_seconds(np.array([rng.uniform(5.5, 12) * 3600 for _ in range(count)]))
+
+    def path(endpoint, i):
+        if endpoint == 'search':
+            return f'/participants?q={requests.utils.quote(rng.choice(surnames))}&limit=10'
+        if endpoint == 'participant':
+            return f'/participants/{rng.choice(race_numbers)}'
+        if endpoint == 'counts':
+            return f'/counts/{requests.utils.quote(rng.choice(DIMENSIONS))}?top=10'
+        by = rng.choice([None, *SLICES])
+        if by is None:
+            return f'/standing?time={times[i]}'
+        value, *others = rng.choice(slice_values[by])
+        query = f'time={times[i]}&by={requests.utils.quote(by)}&value={requests.utils.quote(str(value))}'
+        for column, other in zip(SLICES[by][1:], others):
+            query += f'&{column.lower()}={requests.utils.quote(str(other))}'
+        return f'/standing?{query}'
+
+    endpoints = rng.choices(list(MIX), weights=list(MIX.values()), k=count)
+    return [(endpoint, path(endpoint, i)) for i, endpoint in enumerate(endpoints)]
+
+
+def run_load(url, mix, concurrency, duration=None, total=None):
+    """Send the requests of ``mix`` round robin from ``concurrency`` threads.
+
+    Stops after ``duration`` seconds, or once ``total`` requests were sent.
+    Returns ``(elapsed seconds, [(endpoint, latency seconds, ok)])``.
+    """
+    samples = []
+    lock = threading.Lock()
+    counter = iter(range(total if total is not None else sys.maxsize))
+    deadline = time.perf_counter() + duration if duration else None
+
+    def client():
+        session = requests.Session()
+        local = []
+        while deadline is None or time.perf_counter() < deadline:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            endpoint, path = mix[i % len(mix)]
+            start = time.perf_counter()
+            try:
+                ok = session.get(url + path, timeout=30).status_code == 200
+            except requests.RequestException:
+                ok = False
+            local.append((endpoint, time.perf_counter() - start, ok))
+        with lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, samples
+
+
+def summarize(samples, elapsed):
+    """Return a result per endpoint and one for ``'all'``: requests, errors, req/s and latency percentiles in ms."""
+    results = []
+    for endpoint in [*MIX, 'all']:
+        chosen = [s for s in samples if endpoint in ('all', s[0])]
+        if not chosen:
+            continue
+        latencies = np.array([latency for _, latency, _ in chosen]) * 1000
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+        results.append({'endpoint': endpoint, 'requests': len(chosen),
+                        'errors': sum(not ok for _, _, ok in chosen),
+                        'requests_per_second': len(chosen) / elapsed,
+                        'p50_ms': p50, 'p90_ms': p90, 'p99_ms': p99, 'max_ms': float(latencies.max())})
+    return results
+
+
+def start_server(port, workers, edition=None, catalog=CATALOG_DIR, timeout=120):
+    command = [sys.executable, 'query_api.py', '--port', str(port), '--workers', str(workers),
+               '--catalog', catalog]
+    if edition:
+        command += ['--edition', edition]
+    server = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f'http://127.0.0.1:{port}/health', timeout=1)
+            return server
+        except requests.RequestException:
+            if server.poll() is not None:
+                raise SystemExit(f'query_api.py exited with status {server.returncode}')
+            time.sleep(0.2)
+    server.terminate()
+    raise SystemExit(f'query_api.py did not answer within {timeout}s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:8080', help='API to load (default: %(default)s)')
+    parser.add_argument('--concurrency', type=int, default=16, help='client threads')
+    parser.add_argument('--duration', type=float, default=20.0, help='seconds to run')
+    parser.add_argument('--requests', type=int, help='stop after this many requests instead of --duration')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--edition', help='catalog edition to draw the requests from (default: the newest)')
+    parser.add_argument('--catalog', default=CATALOG_DIR, help='results catalog directory')
+    parser.add_argument('--start-server', action='store_true', help='start query_api.py for the run')
+    parser.add_argument('--workers', type=int, default=4, help='server processes with --start-server')
+    parser.add_argument('-o', '--output', default='load_test_api.json', help='where to write the JSON results')
+    args = parser.parse_args()
+
+    catalog = Catalog.open(args.catalog)
+    edition = args.edition or next(iter(catalog.partitions))
+    mix = request_mix(catalog.load(edition), 10_000, args.seed)
+
+    server = None
+    if args.start_server:
+        port = int(args.url.rsplit(':', 1)[1].split('/')[0])
+        server = start_server(port, args.workers, edition, args.catalog)
+    try:
+        elapsed, samples = run_load(args.url.rstrip('/'), mix, args.concurrency,
+                                    None if args.requests else args.duration, args.requests)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    results = summarize(samples, elapsed)
+    print(f'{args.concurrency} clients, {len(samples):,} requests in {elapsed:.1f}s')
+    print(f'{"endpoint":<12} {"requests":>9} {"errors":>7} {"req/s":>8} {"p50":>8} {"p90":>8} {"p99":>8} {"max":>8}')
+    for r in results:
+        print(f"{r['endpoint']:<12} {r['requests']:>9,} {r['errors']:>7,} {r['requests_per_second']:>8.1f} "
+              f"{r['p50_ms']:>6.1f}ms {r['p90_ms']:>6.1f}ms {r['p99_ms']:>6.1f}ms {r['max_ms']:>6.1f}ms")
+
+    run = {'url': args.url, 'edition': edition, 'concurrency': args.concurrency,
+           'workers': args.workers if args.start_server else None}
+    with open(args.output, 'w') as f:
+        json.dump({'environment': environment(), 'run': run, 'results': results}, f, indent=1)
+    print(f'Wrote {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""Synthetic results shaped like comrades_2025_results.csv, at any field size.
+
+The columns, the status tokens in ``Time``/``Net Time`` (DNF, UOF, DNS, ...),
+the ``<batch> - Group <n>`` waves, categories, genders, countries and the
+share of runners without a club follow the 2025 race. Finish times are drawn
+from its quantiles, so the cut-off rush before 11 and 12 hours is there too.
+Positions are recomputed for the generated times.
+
+    python -m benchmarks.synthetic --rows 1000000 -o synthetic_1m.csv
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from time_parsing import STATUS_TOKENS, format_seconds
+
+SIZES = [22_686, 100_000, 1_000_000, 10_000_000]
+
+# share of each status token (see time_parsing.STATUS_TOKENS, '' is a finisher)
+STATUS_SHARES = [0.8027, 0.0860, 0.0762, 0.0266, 0.0081, 0.0004]
+
+# finish time quantiles of the 2025 race in hours
+_TIME_PROBABILITIES = [0, 0.01, 0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99, 1]
+_TIME_QUANTILES = [5.42, 6.72, 7.69, 8.36, 9.44, 10.62, 11.45, 11.81, 11.92, 11.98, 12.0]
+
+WAVES = {
+    'A - Group 1': 0.0131, 'B - Group 1': 0.0562, 'C - Group 1': 0.0674, 'D - Group 1': 0.0671,
+    'E - Group 1': 0.0673, 'F - Group 1': 0.0670, 'G - Group 1': 0.0665, 'H - Group 1': 0.0644,
+    'J - Group 1': 0.0649, 'K - Group 2': 0.0030, 'L - Group 2': 0.0778, 'M - Group 2': 0.0798,
+    'N - Group 2': 0.0766, 'P - Group 2': 0.0496, 'Q - Group 2': 0.0639, 'R - Group 2': 0.0639,
+    'S - Group 2': 0.0512, 'Wheelchair': 0.0003,
+}
+CATEGORIES = {'Senior': 0.292, '40-49': 0.432, '50-59': 0.218, '60-69': 0.053, '70+': 0.005}
+GENDERS = {'Male': 0.796, 'Female': 0.204}
+COUNTRIES = {
+    ('South Africa', 'ZA'): 0.8714, ('India', 'IN'): 0.0174, ('Zimbabwe', 'ZW'): 0.0169,
+    ('United Kingdom', 'GB'): 0.0146, ('Botswana', 'BW'): 0.0112, ('ANA', 'XX'): 0.0103,
+    ('Brazil', 'BR'): 0.0076, ('United States of America (the)', 'US'): 0.0070, ('Zambia', 'ZM'): 0.0047,
+    ('Australia', 'AU'): 0.0044, ('Eswatini', 'SZ'): 0.0043, ('Namibia', 'NA'): 0.0032,
+    ('Netherlands', 'NL'): 0.0030, ('Lesotho', 'LS'): 0.0030, ('Kenya', 'KE'): 0.0025,
+    ('Japan', 'JP'): 0.0020, ('Poland', 'PL'): 0.0020, ('Hungary', 'HU'): 0.0015,
+    ('Malawi', 'MW'): 0.0015, ('Ireland', 'IE'): 0.0015, ('Switzerland', 'CH'): 0.0015,
+    ('Germany', 'DE'): 0.0015, ('Canada', 'CA'): 0.0015, ('France', 'FR'): 0.0015,
+}
+NO_CLUB_SHARE = 0.039
+RUNNERS_PER_CLUB = 11
+
+_FIRST_NAMES = ['Sipho', 'Thabo', 'Johan', 'Pieter', 'Lerato', 'Nomvula', 'Sarah', 'David', 'Michael', 'Themba',
+                'Bongani', 'Anna', 'Kagiso', 'Lindiwe', 'Willem', 'Ayanda', 'Mandla', 'Zanele', 'Craig', 'Karen',
+                'Priya', 'Ravi', 'Tendai', 'Farai', 'James', 'Emma', 'Neo', 'Lungile', 'André', 'Ruth']
+_SURNAMES = ['NKOSI', 'DLAMINI', 'VAN DER MERWE', 'BOTHA', 'MOKOENA', 'NAIDOO', 'SMITH', 'PILLAY', 'KHUMALO',
+             'NDLOVU', 'DU PLESSIS', 'MTHEMBU', 'JACOBS', 'ZULU', 'VAN WYK', 'MAHLANGU', 'SITHOLE', 'GOVENDER',
+             'MOYO', 'BROWN', 'CELE', 'NEL', 'MOLEFE', 'KRUGER', 'FOURIE', 'SHABALALA', "O'CONNOR", 'MÜLLER']
+_CLUB_WORDS = ['ATHLETIC', 'HARRIERS', 'ROAD RUNNERS', 'STRIDERS', 'RUNNING CLUB', 'MARATHON CLUB', 'AC']
+_CLUB_PLACES = ['DURBAN', 'PRETORIA', 'SOWETO', 'KZN', 'GN', 'WP', 'BOLAND', 'ECA', 'NWN', 'CGA', 'FREE STATE',
+                'PIETERMARITZBURG', 'JOHANNESBURG', 'CAPE TOWN', 'BLOEMFONTEIN']
+
+
+def _choice(rng, shares, rows):
+    values = list(shares)
+    probabilities = np.array([shares[value] for value in values])
+    return np.asarray(values, dtype=object), rng.choice(len(values), rows, p=probabilities / probabilities.sum())
+
+
+def _positions(seconds, groups=None):
+    # 1-based finishing position of every finisher within its group, NA for everyone else
+    order = np.lexsort((seconds,) if groups is None else (seconds, groups))
+    finished = ~np.isnan(seconds[order])
+    pos = np.zeros(len(seconds), dtype=np.int64)
+    if groups is None:
+        pos[order[finished]] = np.arange(1, finished.sum() + 1)
+    else:
+        sorted_groups = groups[order][finished]
+        starts = np.r_[0, np.flatnonzero(np.diff(sorted_groups)) + 1]
+        run_lengths = np.diff(np.r_[starts, len(sorted_groups)])
+        pos[order[finished]] = np.arange(len(sorted_groups)) - np.repeat(starts, run_lengths) + 1
+    return pd.array(np.where(np.isnan(seconds), pd.NA, pos), dtype='Int32')
+
+
+def synthetic_results(rows, seed=0):
+    """Return ``rows`` synthetic results with the columns and text format of the results CSV."""
+    rng = np.random.default_rng(seed)
+
+    status = rng.choice(len(STATUS_TOKENS), rows, p=STATUS_SHARES)
+    finished = status == 0
+    seconds = np.full(rows, np.nan)
+    hours = np.interp(rng.random(int(finished.sum())), _TIME_PROBABILITIES, _TIME_QUANTILES)
+    seconds[finished] = np.round(hours * 3600)
+
+    waves, wave = _choice(rng, WAVES, rows)
+    # later batches cross the start line later, up to about 12 minutes after the gun
+    net_seconds = seconds - np.round(wave * 40 + rng.uniform(0, 30, rows))
+    time_text = format_seconds(seconds)
+    net_time_text = format_seconds(net_seconds)
+    tokens = np.asarray(STATUS_TOKENS, dtype=object)[status]
+    time_text[~finished] = tokens[~finished]
+    net_time_text[~finished] = tokens[~finished]
+
+    categories, category = _choice(rng, CATEGORIES, rows)
+    genders, gender = _choice(rng, GENDERS, rows)
+    countries, country = _choice(rng, COUNTRIES, rows)
+
+    n_clubs = max(1, rows // RUNNERS_PER_CLUB)
+    club_names = np.array([f'{_CLUB_PLACES[i % len(_CLUB_PLACES)]} {_CLUB_WORDS[i % len(_CLUB_WORDS)]} {i // 7 + 1}'
+                           for i in range(n_clubs)], dtype=object)
+    # a few big clubs and a long tail, like the real field
+    club = club_names[np.minimum(rng.zipf(1.6, rows) - 1, n_clubs - 1)]
+    club[rng.random(rows) < NO_CLUB_SHARE] = ''
+
+    first = pd.Categorical.from_codes(rng.integers(0, len(_FIRST_NAMES), rows), _FIRST_NAMES)
+    last = pd.Categorical.from_codes(rng.integers(0, len(_SURNAMES), rows), _SURNAMES)
+    names = pd.Series(first).astype(str) + ' ' + pd.Series(last).astype(str)
+
+    df = pd.DataFrame({
+        'Pos': _positions(seconds),
+        'Race No': rng.permutation(np.arange(1000, 1000 + rows)),
+        'Wave': waves[wave],
+        'Flag': np.array([flag for _, flag in COUNTRIES], dtype=object)[country],
+        'Name': names.to_numpy(dtype=object),
+        'Time': time_text,
+        'Net Time': net_time_text,
+        'Category': categories[category],
+        'Cat Pos': _positions(seconds, category),
+        'Gender': genders[gender],
+        'Gen Pos': _positions(seconds, gender),
+        'Club': club,
+        'Country': np.array([name for name, _ in COUNTRIES], dtype=object)[country],
+    })
+    # finishers in position order first, like the results pages
+    order = np.lexsort((np.arange(rows), np.where(finished, seconds, np.inf)))
+    return df.iloc[order].reset_index(drop=True)
+
+
+def write_synthetic_csv(path, rows, seed=0):
+    synthetic_results(rows, seed).to_csv(path, index=False)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=SIZES[0])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', default='synthetic_results.csv')
+    args = parser.parse_args()
+    write_synthetic_csv(args.output, args.rows, args.seed)
+    print(f'Wrote {args.rows:,} rows to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,273 @@
+"""Finish time distribution charts for the app.
+
+The strip plots used to send every runner to the browser as an SVG marker
+with jitter and hover text, which gets slow and heavy as the field grows.
+They now come in two flavours:
+
+* ``'points'`` draws every finisher as a WebGL scatter point, with fixed
+  jitter offsets computed here instead of letting Plotly jitter client side.
+* ``'density'`` bins the finish times with NumPy on the server and only sends
+  the bin counts.
+
+``'auto'`` picks points while the estimated figure stays under
+``FIGURE_BUDGET_BYTES`` and falls back to density beyond that.
+
+None of the figures depend on the selected participant, so the app builds
+them once per dataset version (see ``results_loader.load_derived``) and
+``participant_figure`` lays the participant's line over a copy of the cached
+overall strip plot.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from cut_offs import CUT_OFFS
+from results_store import finish_hours
+from time_parsing import format_seconds
+
+RENDER_MODES = ['auto', 'points', 'density']
+
+# rough serialized size of one hover-enabled point (two float32 coordinates plus
+# name, country, category and time strings), used to estimate figure size
+BYTES_PER_POINT = 90
+FIGURE_BUDGET_BYTES = int(os.environ.get('COMRADES_FIGURE_BUDGET_BYTES', 4 * 1024 * 1024))
+
+# density bin width in hours (five minutes)
+BIN_HOURS = 5 / 60
+
+# cut-off band colours, in ``cut_offs.BANDS`` order
+BAND_COLORS = ['#d4af37', '#9370db', '#c0c0c0', '#1f77b4', '#2ca02c', '#cd7f32', '#8c564b', '#d9d9d9']
+
+_HOVER_COLUMNS = ['Name', 'Country', 'Category']
+_HOVER_TEMPLATE = ('<b>%{customdata[0]}</b><br>Country: %{customdata[1]}<br>'
+                   'Category: %{customdata[2]}<br>Time: %{customdata[3]}<extra></extra>')
+
+
+def choose_render_mode(n_points, mode='auto', budget=None):
+    """Resolve ``'auto'`` to ``'points'`` or ``'density'`` for a chart of ``n_points``."""
+    if mode != 'auto':
+        return mode
+    budget = FIGURE_BUDGET_BYTES if budget is None else budget
+    return 'points' if n_points * BYTES_PER_POINT <= budget else 'density'
+
+
+def add_cut_off_lines(fig):
+    for cut_off in CUT_OFFS:
+        fig.add_hline(y=cut_off.hours, line=dict(color='black', width=0.6, dash='dash'),
+                      annotation_text=f'{cut_off.label} ', annotation_position='bottom right')
+
+
+def add_participant_line(fig, participant_details):
+    if pd.notna(participant_details['Time (seconds)']):
+        fig.add_hline(y=participant_details['Time (seconds)'] / 3600,
+                      line=dict(color='orange', width=3, dash='solid'),
+                      annotation_text=f'{participant_details["Name"].upper()}',
+                      annotation_position='top left',
+                      annotation=dict(font=dict(size=18)))
+
+
+def participant_figure(template, participant_details):
+    """Return a copy of the cached ``template`` figure with the participant's line added.
+
+    The template was validated when it was built, so the copy skips Plotly's
+    validation, which is most of the cost of copying 20k hover points.
+    """
+    fig = go.Figure(template, _validate=False)
+    add_participant_line(fig, participant_details)
+    return fig
+
+
+def performance_gauge(fraction, title):
+    """Gauge of a 0-1 ``fraction`` (lower is better) shown as a percentage."""
+    return go.Figure(go.Indicator(
+        mode="gauge+number",
+        value=fraction * 100,
+        number={'valueformat': '.2f', 'suffix': '%'},
+        title={'text': title},
+        gauge={
+            'axis': {'range': [0, 100]},
+            'bar': {'color': "darkblue"},
+            'steps': [
+                {'range': [0, 33.33], 'color': "green"},
+                {'range': [33.33, 66.67], 'color': "yellow"},
+                {'range': [66.67, 100], 'color': "red"}
+            ]
+        }
+    ))
+
+
+def _count_bar_figure(counts, title, color, axis_title):
+    counts = counts.sort_values(ascending=True)
+    fig = px.bar(counts.reset_index(),
+                 x='count',
+                 y=axis_title,
+                 title=title,
+                 color_discrete_sequence=[color],
+                 orientation='h')
+    fig.update_layout(
+        title_font_size=24,
+        font=dict(size=14),
+        xaxis_title="Number of Participants",
+        yaxis_title=axis_title,
+        xaxis=dict(
+            tickfont=dict(size=16)
+        ),
+        yaxis=dict(
+            tickfont=dict(size=16)
+        )
+    )
+    fig.update_traces(
+        textposition='inside',
+        text=counts,
+        texttemplate='%{text:,}'
+    )
+    return fig
+
+
+def status_bar_figure(rollups):
+    """Number of participants by finishing status, from a ``rollups.Rollups``."""
+    return _count_bar_figure(rollups.counts('Status'), 'Number of Participants by Finishing Status',
+                             'darkred', 'Status')
+
+
+def country_bar_figure(rollups, top=5):
+    """The ``top`` countries by number of participants."""
+    return _count_bar_figure(rollups.counts('Country').iloc[:top],
+                             f'Top {top} Countries by Number of Participants', 'darkgreen', 'Country')
+
+
+def category_bar_figure(rollups):
+    """Number of participants by age category."""
+    return _count_bar_figure(rollups.counts('Category'), 'Number of Participants by Age Category',
+                             'darkorange', 'Category')
+
+
+def cut_off_band_figure(bands, by):
+    """Number of participants per cut-off band for each value of ``by``, from a ``cut_offs.CutOffBands``."""
+    table = bands.table(by)
+    labels = table.index.astype(str)
+    fig = go.Figure([go.Bar(x=table[band], y=labels, name=band, orientation='h', marker_color=color,
+                            hovertemplate=f'{band}: %{{x:,}}<extra></extra>')
+                     for band, color in zip(table.columns, BAND_COLORS)])
+    fig.update_layout(
+        barmode='stack',
+        title=f'Participants by Cut-Off Made, by {by}',
+        title_font_size=24,
+        font=dict(size=14),
+        xaxis_title="Number of Participants",
+        yaxis_title=by,
+        yaxis=dict(tickfont=dict(size=16), autorange='reversed'),
+        legend_traceorder='normal',
+        legend_title_text='Cut-off made',
+        height=max(450, 35 * len(table) + 150),
+    )
+    return fig
+
+
+def _finishers(df):
+    hours = finish_hours(df)
+    return ~np.isnan(hours), hours
+
+
+def _jitter(n):
+    # the same horizontal offsets on every build, so cached and rebuilt figures match
+    return np.random.default_rng(0).uniform(-0.5, 0.5, n).astype(np.float32)
+
+
+def _hover_data(df, mask, hours):
+    columns = [df[col].to_numpy(dtype=object)[mask] for col in _HOVER_COLUMNS]
+    return np.column_stack(columns + [format_seconds(hours[mask] * 3600)])
+
+
+def bin_edges(hours):
+    """Density bin edges, ``BIN_HOURS`` apart, covering ``hours`` and at least 5 to 12 hours."""
+    top = max(12.0, np.ceil(hours.max())) if hours.size else 12.0
+    bottom = min(5.0, np.floor(hours.min())) if hours.size else 5.0
+    return np.arange(bottom, top + BIN_HOURS / 2, BIN_HOURS)
+
+
+def _strip_layout(fig, title, **layout):
+    fig.update_layout(
+        title=title,
+        title_font_size=24,
+        template='simple_white',
+        yaxis={'autorange': 'reversed',
+               'ticksuffix': ' hours'},  # Add 'hours' suffix to y-axis labels
+        yaxis_showticklabels=True,
+        height=900,
+        font=dict(size=14),  # Increase general font size
+        **layout
+    )
+    add_cut_off_lines(fig)
+    return fig
+
+
+def wave_strip_figure(df, mode='auto', title='Distribution of Finish Times at Comrades Marathon 2025 by Group'):
+    """Finish times per start batch, coloured by wave group."""
+    finished, hours = _finishers(df)
+    mode = choose_render_mode(int(finished.sum()), mode)
+
+    # batches sorted alphabetically, without sorting the frame itself
+    batch_codes, batches = pd.factorize(df['Batch Letter'], sort=True)
+    fig = go.Figure()
+
+    if mode == 'points':
+        wave_codes, waves = pd.factorize(df['Wave Number'], sort=True)
+        x = (batch_codes + _jitter(len(df)) * 0.8).astype(np.float32)
+        colors = px.colors.qualitative.Set2
+        for code, wave in enumerate(waves):
+            mask = finished & (wave_codes == code)
+            fig.add_trace(go.Scattergl(
+                x=x[mask], y=hours[mask].astype(np.float32), mode='markers', name=wave,
+                marker=dict(size=3, opacity=0.3, color=colors[code % len(colors)]),
+                customdata=_hover_data(df, mask, hours), hovertemplate=_HOVER_TEMPLATE,
+            ))
+        legend = dict(
+            font=dict(size=20),  # Increased legend font size
+            itemsizing='constant',  # Make legend items consistent size
+            itemwidth=30  # Increase width of legend items
+        )
+        layout = dict(showlegend=True, legend=legend)
+    else:
+        edges = bin_edges(hours[finished])
+        counts = np.stack([np.histogram(hours[finished & (batch_codes == code)], bins=edges)[0]
+                           for code in range(len(batches))], axis=1)
+        fig.add_trace(go.Heatmap(
+            x=np.arange(len(batches)), y=(edges[:-1] + edges[1:]) / 2, z=np.where(counts > 0, counts, np.nan),
+            colorscale='Viridis', colorbar=dict(title='Runners'),
+            hovertemplate='Batch %{customdata}<br>%{y:.2f} hours<br>%{z} runners<extra></extra>',
+            customdata=np.tile(np.asarray(batches, dtype=object), (len(edges) - 1, 1)),
+        ))
+        layout = dict(showlegend=False)
+
+    fig.update_xaxes(tickmode='array', tickvals=np.arange(len(batches)), ticktext=list(batches))
+    return _strip_layout(fig, title, xaxis_title='Batch', xaxis_showticklabels=True, **layout)
+
+
+def overall_strip_figure(df, mode='auto', title='Overall Distribution of Finish Times at Comrades Marathon 2025'):
+    """Finish times of the whole field in one column."""
+    finished, hours = _finishers(df)
+    mode = choose_render_mode(int(finished.sum()), mode)
+    fig = go.Figure()
+
+    if mode == 'points':
+        fig.add_trace(go.Scattergl(
+            x=_jitter(len(df))[finished], y=hours[finished].astype(np.float32),
+            mode='markers', marker=dict(size=3, opacity=0.3),
+            customdata=_hover_data(df, finished, hours), hovertemplate=_HOVER_TEMPLATE,
+        ))
+        fig.update_xaxes(showticklabels=False, range=[-1, 1])
+        x_title = 'Time (hours)'
+    else:
+        edges = bin_edges(hours[finished])
+        counts, _ = np.histogram(hours[finished], bins=edges)
+        fig.add_trace(go.Bar(
+            x=counts, y=(edges[:-1] + edges[1:]) / 2, width=BIN_HOURS, orientation='h',
+            hovertemplate='%{y:.2f} hours<br>%{x} runners<extra></extra>',
+        ))
+        x_title = 'Number of Participants'
+
+    return _strip_layout(fig, title, showlegend=False, xaxis_title=x_title)
@@ -0,0 +1,120 @@
+"""Runners around a runner: finish time neighbours, time windows and club and wave groups.
+
+"Who finished within two minutes of me?", "which of my club mates ran in my
+wave?" and "how spread out was the bus that beat the Bill Rowan cut-off?"
+are all answered by filtering the whole field with a boolean mask each
+rerun. ``Cohorts`` instead orders the finishers by time once per dataset
+version and keeps the rows of every club and wave contiguous (by finish
+time, non-finishers last). A time window or the k nearest finishers is then
+a binary search into the sorted times, and a group is a slice.
+"""
+import numpy as np
+import pandas as pd
+
+from results_store import finish_seconds
+from time_parsing import format_seconds
+
+GROUPS = ['Club', 'Wave']
+
+
+class Cohorts:
+    def __init__(self, df, groups=GROUPS):
+        self.seconds = finish_seconds(df)
+        finished = ~np.isnan(self.seconds)
+        rows = np.flatnonzero(finished)
+        self.order = rows[np.argsort(self.seconds[rows], kind='stable')]  # finishers' rows by finish time
+        self.times = self.seconds[self.order]
+
+        self.codes = {}  # column -> (per row code into values, -1 where missing; values)
+        self.groups = {}  # column -> (rows by (code, finish time), bounds of each code in them)
+        keys = np.where(finished, self.seconds, np.inf)
+        for column in groups:
+            codes, values = pd.factorize(df[column], sort=True)
+            order = np.lexsort((keys, codes))
+            order = order[codes[order] >= 0]
+            self.groups[column] = (order, np.searchsorted(codes[order], np.arange(len(values) + 1)))
+            self.codes[column] = (codes, values)
+
+    def window(self, low, high):
+        """Return the rows of the runners who finished between ``low`` and ``high`` seconds, fastest first."""
+        start = np.searchsorted(self.times, low, side='left')
+        stop = np.searchsorted(self.times, high, side='right')
+        return self.order[start:stop]
+
+    def around(self, row, seconds):
+        """Return the rows of the other runners who finished within ``seconds`` of the runner at ``row``."""
+        own = self.seconds[row]
+        if np.isnan(own):
+            return self.order[:0]
+        rows = self.window(own - seconds, own + seconds)
+        return rows[rows != row]
+
+    def nearest(self, row, k=10):
+        """Return the rows of the ``k`` finishers closest in time to the runner at ``row``, closest first."""
+        own = self.seconds[row]
+        if np.isnan(own):
+            return self.order[:0]
+        # the runner's own place in the order, among the runners with the same time
+        start, stop = np.searchsorted(self.times, own, side='left'), np.searchsorted(self.times, own, side='right')
+        at = start + int(np.flatnonzero(self.order[start:stop] == row)[0])
+        # the k closest are among the k either side
+        positions = np.r_[max(at - k, 0):at, at + 1:min(at + k + 1, len(self.order))]
+        closest = np.argsort(np.abs(self.times[positions] - own), kind='stable')[:k]
+        return self.order[positions[closest]]
+
+    def group(self, column, value):
+        """Return the rows whose ``column`` is ``value``, by finish time with non-finishers last."""
+        codes, values = self.codes[column]
+        code = values.get_loc(value) if value in values else -1
+        return self._group_rows(column, code)
+
+    def _group_rows(self, column, code):
+        if code < 0:
+            return self.order[:0]
+        order, bounds = self.groups[column]
+        return order[bounds[code]:bounds[code + 1]]
+
+    def group_of(self, column, row):
+        """Return the rows sharing the runner at ``row``'s ``column``, the runner included."""
+        return self._group_rows(column, self.codes[column][0][row])
+
+    def club_mates(self, row, within='Wave'):
+        """Return the rows of the runner at ``row``'s club mates, only those sharing their ``within`` group if given."""
+        rows = self.group_of('Club', row)
+        if within is not None:
+            codes = self.codes[within][0]
+            rows = rows[codes[rows] == codes[row]]
+        return rows[rows != row]
+
+    def club_counts(self, rows):
+        """Return the number of runners per club among ``rows``, largest first."""
+        codes, values = self.codes['Club']
+        codes = codes[rows]
+        counts = np.bincount(codes[codes >= 0], minlength=len(values))
+        present = np.flatnonzero(counts)
+        return pd.Series(counts[present], index=values[present], name='Runners').sort_values(
+            ascending=False, kind='stable')
+
+    def spread(self, rows):
+        """Return the finishers among ``rows``, and their first, median and last finish seconds."""
+        times = np.sort(self.seconds[rows])
+        times = times[~np.isnan(times)]
+        if not len(times):
+            return {'finishers': 0, 'first': np.nan, 'median': np.nan, 'last': np.nan}
+        return {'finishers': len(times), 'first': float(times[0]), 'median': float(np.median(times)),
+                'last': float(times[-1])}
+
+    def table(self, df, rows, seconds=None):
+        """Return the display table of ``rows``, with each runner's gap to ``seconds`` if given."""
+        table = pd.DataFrame({
+            'Name': df['Name'].to_numpy()[rows],
+            'Race No': df['Race No'].to_numpy()[rows],
+            'Club': df['Club'].to_numpy()[rows],
+            'Wave': df['Wave'].to_numpy()[rows],
+            'Time': format_seconds(self.seconds[rows]),
+        })
+        if seconds is not None:
+            gaps = self.seconds[rows] - seconds
+            table['Gap'] = np.where(gaps < 0, '-', '+') + format_seconds(np.abs(gaps)).astype(str)
+            table.loc[np.isnan(gaps), 'Gap'] = ''
+        return table
@@ -0,0 +1,77 @@
+"""The race's cut-offs and the cut-off band every runner falls in.
+
+``CUT_OFFS`` is the one table of cut-off times. The charts draw their cut-off
+lines from it, and ``CutOffBands`` puts every runner in the band of the
+fastest cut-off they made with a single ``np.digitize`` over the finish
+times. The bands are then counted per wave, category and gender with one
+``np.bincount`` per breakdown, once per dataset version (through
+``results_loader.load_derived``), instead of filtering the frame once per
+cut-off and group.
+
+A finish exactly on a cut-off makes it, the way a 12:00:00 finish still
+earns a Vic Clapham medal. Runners without an official finish are in
+``NO_BAND``.
+
+A band is the fastest cut-off a time made, not the medal the runner got:
+medals also depend on gender (the Isavel Roche-Kelly medal is for women,
+Silver for men) and the top ten men and women get gold, none of which is
+modelled here.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from results_store import finish_seconds
+
+
+class CutOff(namedtuple('CutOff', ['hours', 'medal'])):
+    @property
+    def label(self):
+        return f'{self.medal} Cut-Off'
+
+
+CUT_OFFS = [
+    CutOff(6, 'Wally Hayward'),
+    CutOff(7, 'Isavel Roche-Kelly'),
+    CutOff(7.5, 'Silver'),
+    CutOff(9, 'Bill Rowan'),
+    CutOff(10, 'Robert Mtshali'),
+    CutOff(11, 'Bronze'),
+    CutOff(12, 'Vic Clapham'),
+]
+
+NO_BAND = 'No official finish'
+BANDS = [cut_off.medal for cut_off in CUT_OFFS] + [NO_BAND]
+
+BREAKDOWNS = ['Wave', 'Category', 'Gender']
+
+_EDGES = np.array([cut_off.hours * 3600 for cut_off in CUT_OFFS], dtype=np.float64)
+
+
+def assign_bands(seconds):
+    """Return each finish time's band as an index into ``BANDS``, NaN (no finish) goes to ``NO_BAND``."""
+    # right=True keeps a time equal to a cut-off inside it, NaN sorts past the last edge
+    return np.digitize(seconds, _EDGES, right=True).astype(np.int8)
+
+
+class CutOffBands:
+    def __init__(self, df, breakdowns=BREAKDOWNS):
+        self.bands = assign_bands(finish_seconds(df))
+        self.totals = pd.Series(np.bincount(self.bands, minlength=len(BANDS)), index=BANDS, name='count')
+        self._tables = {}
+        for column in breakdowns:
+            codes, values = pd.factorize(df[column], sort=True)
+            known = codes >= 0
+            # one bincount over (group, band) pairs gives the whole group x band table
+            counts = np.bincount(codes[known] * len(BANDS) + self.bands[known], minlength=len(values) * len(BANDS))
+            self._tables[column] = pd.DataFrame(counts.reshape(len(values), len(BANDS)),
+                                                index=pd.Index(values, name=column), columns=BANDS)
+
+    def band(self, row):
+        """Return the band of the runner at row position ``row``, the name of a cut-off or ``NO_BAND``."""
+        return BANDS[self.bands[row]]
+
+    def table(self, by):
+        """Return the number of runners per band (columns, ``BANDS`` order) for each value of ``by``."""
+        return self._tables[by]
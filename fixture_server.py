@@ -0,0 +1,241 @@
+"""Local stand-in for results.finishtime.co.za, for running the scraper offline.
+
+Serves ``/results.aspx?...&PageNo=N`` either from a directory of saved pages
+(``page_0001.html``, ``page_0002.html``, ...) or by rendering pages in the
+finishtime table layout from a results CSV.
+
+    python fixture_server.py --csv comrades_2025_results.csv --port 8000
+    python scraper.py --base-url http://127.0.0.1:8000/results.aspx --last-page 454
+
+With ``--live`` the CSV is replayed as a race in progress on a fast clock
+(see ``RaceDaySite``), for trying out ``live_ingest.py``:
+
+    python fixture_server.py --csv comrades_2025_results.csv --live --start-hours 9 --speed 120
+"""
+import argparse
+import hashlib
+import html
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from results_parser import HEADERS, TABLE_CLASS
+from results_store import CUT_OFF_SECONDS
+from time_parsing import parse_times
+
+PAGE_SIZE = 50
+
+NO_RESULTS_PAGE = '<html><body><p>No results</p></body></html>'
+
+# time column tokens shown from the gun, everyone else is "Started" until they finish or the race closes
+_PRE_RACE_TOKENS = {'Not started', 'DNS'}
+
+_HEADER_CELLS = ['Fav', 'Pos', 'Pos', '', 'Race No', 'Wave', '', 'Name', 'Name', 'Time', 'Net Time',
+                 'Category', 'Cat Pos', 'Gender', 'Gen Pos', 'Club', 'Country']
+
+
+def _text(value):
+    return '' if pd.isna(value) else html.escape(str(value))
+
+
+def _render_row(row):
+    flag = _text(row['Flag'])
+    flag_img = f'<img src="https://images.racetec.net/flags/16/{flag}.png" alt="{flag}">' if flag else ''
+    pos = _text(row['Pos'])
+    name = _text(row['Name'])
+    cells = [
+        '<i class="fa fa-star"></i>',
+        pos,
+        pos,
+        '<img src="/img/x-twitter.svg"><img src="/img/facebook.svg">',
+        _text(row['Race No']),
+        _text(row['Wave']),
+        flag_img,
+        f'<a class="ltw-name" href="#">{name}</a>',
+        f'<a class="ltw-name" href="#">{name}</a> #{_text(row["Race No"])} {_text(row["Category"])}',
+        _text(row['Time']),
+        _text(row['Net Time']),
+        _text(row['Category']),
+        _text(row['Cat Pos']),
+        _text(row['Gender']),
+        _text(row['Gen Pos']),
+        f'<a class="ltw-name" href="#">{_text(row["Club"])}</a>' if _text(row['Club']) else '',
+        _text(row['Country']),
+    ]
+    return '<tr>' + ''.join(f'<td>{cell}</td>' for cell in cells) + '</tr>'
+
+
+def render_results_page(rows):
+    """Render runner rows (a string frame with the scraper's ``HEADERS``) as a finishtime results page."""
+    header = '<tr>' + ''.join(
+        f'<td><a class="ltw-nodecor" href="#">{cell}</a></td>' if cell else '<td></td>'
+        for cell in _HEADER_CELLS) + '</tr>'
+    body = '\n'.join(_render_row(row) for _, row in rows.iterrows())
+    return (f'<html><head><title>Results</title></head><body>'
+            f'<table class="{TABLE_CLASS}">\n{header}\n{body}\n</table></body></html>')
+
+
+class FixtureSite:
+    """The pages the fixture server hands out, keyed by page number."""
+
+    def __init__(self, pages):
+        self.pages = pages
+
+    @classmethod
+    def from_csv(cls, csv_path, page_size=PAGE_SIZE):
+        df = pd.read_csv(csv_path, dtype=object, keep_default_na=False)[HEADERS]
+        pages = {}
+        for page, start in enumerate(range(0, len(df), page_size), start=1):
+            pages[page] = render_results_page(df.iloc[start:start + page_size])
+        return cls(pages)
+
+    @classmethod
+    def from_directory(cls, directory):
+        pages = {}
+        for name in os.listdir(directory):
+            if name.startswith('page_') and name.endswith('.html'):
+                with open(os.path.join(directory, name), encoding='utf-8') as f:
+                    pages[int(name[5:-5])] = f.read()
+        return cls(pages)
+
+    def get(self, page):
+        # past the last page finishtime returns a page without a results table
+        return self.pages.get(page, NO_RESULTS_PAGE)
+
+
+class RaceDaySite(FixtureSite):
+    """The pages of a results CSV as they would have looked during the race.
+
+    ``clock()`` gives the race time in seconds. Runners who haven't reached
+    their finish time yet show as ``Started`` without positions, and the
+    finishers so far are listed first, so pages change and runners move
+    between pages as the clock runs. DNF and UOF only show once the race
+    has closed, at which point the pages match the CSV.
+    """
+
+    def __init__(self, df, page_size=PAGE_SIZE, clock=None, start=0.0, speed=60.0):
+        self.df = df
+        self.page_size = page_size
+        if clock is None:
+            started = time.monotonic()
+            clock = lambda: start + (time.monotonic() - started) * speed
+        self.clock = clock
+        status, seconds = parse_times(df['Time'])
+        self.finish = np.where(status == 0, seconds, np.inf)
+        self.pre_race = df['Time'].isin(_PRE_RACE_TOKENS).to_numpy()
+        self._lock = threading.Lock()
+        self._state = None  # (runners finished, race closed) the cached pages were rendered for
+        self._rows = None
+        self._pages = {}
+
+    @classmethod
+    def from_csv(cls, csv_path, page_size=PAGE_SIZE, **clock):
+        return cls(pd.read_csv(csv_path, dtype=object, keep_default_na=False)[HEADERS], page_size, **clock)
+
+    @property
+    def pages(self):
+        return range(1, -(-len(self.df) // self.page_size) + 1)
+
+    def _update(self):
+        now = self.clock()
+        finished = self.finish <= now
+        state = (int(finished.sum()), now >= CUT_OFF_SECONDS)
+        if state == self._state:
+            return
+        rows = self.df
+        if not state[1]:
+            running = ~(finished | self.pre_race)
+            rows = rows.copy()
+            rows.loc[running, ['Time', 'Net Time']] = 'Started'
+            rows.loc[running, ['Pos', 'Cat Pos', 'Gen Pos']] = ''
+            rows = rows.iloc[np.argsort(~finished, kind='stable')]
+        self._state, self._rows, self._pages = state, rows, {}
+
+    def get(self, page):
+        with self._lock:
+            self._update()
+            if page not in self._pages:
+                start = (page - 1) * self.page_size
+                if page < 1 or start >= len(self._rows):
+                    return NO_RESULTS_PAGE
+                self._pages[page] = render_results_page(self._rows.iloc[start:start + self.page_size])
+            return self._pages[page]
+
+
+def _make_handler(site, fail_rate):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != '/results.aspx':
+                self.send_error(404)
+                return
+            if fail_rate and random.random() < fail_rate:
+                self.send_error(503)
+                return
+            page = int(parse_qs(url.query).get('PageNo', ['1'])[0])
+            body = site.get(page).encode('utf-8')
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(site, host='127.0.0.1', port=0, fail_rate=0.0):
+    """Start serving ``site`` on a background thread.
+
+    Returns ``(server, base_url)``, call ``server.shutdown()`` when done.
+    """
+    server = ThreadingHTTPServer((host, port), _make_handler(site, fail_rate))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://{host}:{server.server_address[1]}/results.aspx'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve saved or generated finishtime results pages locally.')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--csv', help='render pages from a results CSV')
+    source.add_argument('--pages-dir', help='serve saved page_NNNN.html files')
+    parser.add_argument('--page-size', type=int, default=PAGE_SIZE)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--fail-rate', type=float, default=0.0,
+                        help='fraction of requests answered with a 503, to exercise retries')
+    parser.add_argument('--live', action='store_true', help='replay the CSV as a race in progress')
+    parser.add_argument('--start-hours', type=float, default=5.0, help='race time when the server starts (--live)')
+    parser.add_argument('--speed', type=float, default=60.0, help='race seconds per second (--live)')
+    args = parser.parse_args()
+    if args.live and not args.csv:
+        parser.error('--live needs --csv')
+
+    if args.live:
+        site = RaceDaySite.from_csv(args.csv, args.page_size, start=args.start_hours * 3600, speed=args.speed)
+    elif args.csv:
+        site = FixtureSite.from_csv(args.csv, args.page_size)
+    else:
+        site = FixtureSite.from_directory(args.pages_dir)
+    server, base_url = serve(site, args.host, args.port, args.fail_rate)
+    print(f'Serving {len(site.pages)} pages at {base_url}?PageNo=1')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
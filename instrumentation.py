@@ -0,0 +1,150 @@
+"""Per-stage timing of an app rerun, for the debug panel and the logs.
+
+``app.py`` wraps each stage of a rerun (loading, rollups, figures, search,
+rankings) in ``profiler.stage(name)`` and draws its charts through
+``profiler.plotly_chart``. With profiling off, ``stage`` hands back a shared
+no-op context manager and ``plotly_chart`` calls straight through, so the
+instrumentation costs a method call per stage. With it on, each stage
+records:
+
+* its wall time,
+* its peak allocation over the memory held when it started, when
+  allocation tracing is on (``tracemalloc``, which slows the rerun down), and
+* for charts, the size of the figure's JSON, i.e. what is sent to the browser.
+
+Tracing is process wide, so it is shared by every session that asks for it:
+it starts with the first and stops after the last (unless something else
+started it), and traced stages take turns, one at a time across sessions, so
+that one session's ``tracemalloc.reset_peak`` doesn't reset the peak another
+is measuring. Their peaks still include what other sessions allocate
+meanwhile.
+
+Profiling is switched on per session from the debug panel in the sidebar, or
+for every session with ``COMRADES_PROFILE=1`` (``COMRADES_PROFILE=memory``
+also traces allocations). Every profiled rerun is logged as one JSON line per
+stage on the ``comrades.perf`` logger. Sections of the page that rerun on
+their own (``st.fragment``) keep a profiler of their own, told apart in the
+logs by its ``scope``.
+"""
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+import uuid
+import weakref
+
+import plotly.io as pio
+
+logger = logging.getLogger('comrades.perf')
+
+PROFILE_ALL = os.environ.get('COMRADES_PROFILE', '') not in ('', '0')
+TRACE_ALL = os.environ.get('COMRADES_PROFILE', '') == 'memory'
+
+_NOOP = contextlib.nullcontext()
+
+# profilers tracing allocations right now, and whether tracing was started for them
+_tracing_lock = threading.Lock()
+_tracers = 0
+_started_tracing = False
+# held through a traced stage, stages of the same rerun nest
+_traced_stage_lock = threading.RLock()
+
+
+def _start_tracing():
+    global _tracers, _started_tracing
+    with _tracing_lock:
+        if _tracers == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracing = True
+        _tracers += 1
+
+
+def _stop_tracing():
+    global _tracers, _started_tracing
+    with _tracing_lock:
+        _tracers -= 1
+        if _tracers == 0 and _started_tracing:
+            tracemalloc.stop()
+            _started_tracing = False
+
+
+def _ensure_log_handler():
+    # streamlit only configures its own loggers, print ours on stderr as plain JSON lines
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+
+class Profiler:
+    def __init__(self, enabled=PROFILE_ALL, trace_memory=TRACE_ALL, scope='page'):
+        self.enabled = enabled
+        self.scope = scope
+        self.trace_memory = enabled and trace_memory
+        self.records = []
+        self.run_id = uuid.uuid4().hex[:8] if enabled else None
+        self._started = time.perf_counter()
+        self._release_tracing = None
+        if self.trace_memory:
+            _start_tracing()
+            # a rerun cut short by the next one never gets to finish(), give tracing up when it is dropped
+            self._release_tracing = weakref.finalize(self, _stop_tracing)
+
+    def stage(self, name):
+        """Context manager recording the stage ``name``, a no-op when profiling is off."""
+        if not self.enabled:
+            return _NOOP
+        return self._measure(name)
+
+    @contextlib.contextmanager
+    def _measure(self, name, **extra):
+        if not self.trace_memory:
+            start = time.perf_counter()
+            try:
+                yield
+            finally:
+                self.records.append({'stage': name, 'seconds': time.perf_counter() - start, **extra})
+            return
+        with _traced_stage_lock:
+            tracemalloc.reset_peak()
+            held = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
+            try:
+                yield
+            finally:
+                self.records.append({'stage': name, 'seconds': time.perf_counter() - start, **extra,
+                                     'peak_bytes': tracemalloc.get_traced_memory()[1] - held})
+
+    def plotly_chart(self, container, name, fig, **kwargs):
+        """``container.plotly_chart(fig, **kwargs)``, recorded with the figure's payload size."""
+        if not self.enabled:
+            return container.plotly_chart(fig, **kwargs)
+        # serializing twice is only paid while profiling
+        payload_bytes = len(pio.to_json(fig, validate=False))
+        with self._measure(f'chart: {name}', payload_bytes=payload_bytes):
+            return container.plotly_chart(fig, **kwargs)
+
+    def finish(self):
+        """End the run: give up tracing (stopped after the last session using it) and log the stages."""
+        if not self.enabled:
+            return
+        if self._release_tracing is not None:
+            self._release_tracing()
+        total = time.perf_counter() - self._started
+        self.records.append({'stage': 'total', 'seconds': total})
+        _ensure_log_handler()
+        for record in self.records:
+            logger.info(json.dumps({'event': 'stage', 'run': self.run_id, 'scope': self.scope, **record}))
+
+    def table(self):
+        """The recorded stages as rows for ``st.dataframe``."""
+        return [{'Stage': r['stage'],
+                 'ms': round(r['seconds'] * 1000, 1),
+                 'Peak alloc (KB)': round(r['peak_bytes'] / 1024) if 'peak_bytes' in r else None,
+                 'Payload (KB)': round(r['payload_bytes'] / 1024) if 'payload_bytes' in r else None}
+                for r in self.records]
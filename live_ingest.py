@@ -0,0 +1,166 @@
+"""Poll the results pages on race day and keep a results CSV up to date.
+
+Every ``--interval`` seconds all the result pages are fetched again over the
+scraper's pooled, rate limited session. Pages whose content hash matches the
+previous poll are skipped without parsing. The rows of every changed page are
+upserted by ``Race No``, so a runner who goes from ``Started`` to a finish
+time (and from the back of the list to a page among the finishers) replaces
+their earlier row. Rows are never deleted, a runner missing from a poll keeps
+their last row. The CSV lists finishers first by ``Pos`` and everyone else
+in the order of the pages, like the final results, however the pages have
+shifted between polls.
+
+When a poll changed anything the CSV is rewritten (atomically). A running app
+picks the new version up without a restart, and ``results_loader`` moves its
+rollups and rankings by the changed rows rather than rebuilding them.
+
+    python fixture_server.py --csv comrades_2025_results.csv --live --port 8000
+    python live_ingest.py --base-url http://127.0.0.1:8000/results.aspx --interval 30
+"""
+import argparse
+import hashlib
+import logging
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from results_parser import HEADERS, parse_results_page
+from scraper import BASE_URL, DEFAULT_PARAMS, TokenBucket, fetch_page, make_session
+
+logger = logging.getLogger(__name__)
+
+_RACE_NO = HEADERS.index('Race No')
+_POS = HEADERS.index('Pos')
+
+PollResult = namedtuple('PollResult', ['pages', 'changed_pages', 'inserted', 'updated'])
+
+
+class LiveResults:
+    """The latest row of every runner, keyed on ``Race No``, and a content hash per page."""
+
+    def __init__(self):
+        self.rows = {}  # race no -> row, ordered like HEADERS
+        self.places = {}  # race no -> (page, position on the page) where the row was last seen
+        self.page_hashes = {}  # page -> sha256 of its HTML at the last poll
+
+    @classmethod
+    def from_csv(cls, path):
+        """Start from the rows of an earlier CSV, e.g. when restarted mid-race."""
+        live = cls()
+        if os.path.exists(path):
+            df = pd.read_csv(path, dtype=object, keep_default_na=False)[HEADERS]
+            # page 0 keeps them in file order until they are seen on a page again
+            live.upsert(0, [list(row) for row in df.itertuples(index=False, name=None)])
+        return live
+
+    def page_changed(self, page, html):
+        """Return whether ``html`` differs from what ``page`` held at the previous poll."""
+        digest = hashlib.sha256(html.encode('utf-8')).hexdigest()
+        if self.page_hashes.get(page) == digest:
+            return False
+        self.page_hashes[page] = digest
+        return True
+
+    def upsert(self, page, rows):
+        """Insert or replace the ``rows`` parsed from ``page``, returns ``(inserted, updated)`` counts."""
+        inserted = updated = 0
+        for position, row in enumerate(rows):
+            race_no = row[_RACE_NO]
+            if not race_no:
+                continue
+            old = self.rows.get(race_no)
+            if old is None:
+                inserted += 1
+            elif old != row:
+                updated += 1
+            self.rows[race_no] = row
+            self.places[race_no] = (page, position)
+        return inserted, updated
+
+    def _order(self, race_no):
+        # finishers first by position, then everyone else where they were last seen
+        pos = self.rows[race_no][_POS]
+        return (0, int(pos), self.places[race_no]) if pos.isdigit() else (1, 0, self.places[race_no])
+
+    def frame(self):
+        """Return every runner's latest row as a string frame, finishers by ``Pos`` and then in page order."""
+        order = sorted(self.rows, key=self._order)
+        return pd.DataFrame([self.rows[race_no] for race_no in order], columns=HEADERS)
+
+    def write_csv(self, path):
+        # write next to the target and rename so the app never reads a half written file
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        self.frame().to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+
+def poll(live, pages, session, bucket, base_url=BASE_URL, params=DEFAULT_PARAMS, concurrency=4, retries=5):
+    """Fetch ``pages`` once and upsert the rows of every page that changed into ``live``."""
+    def fetch(page):
+        return page, fetch_page(session, bucket, base_url, {**params, 'PageNo': page}, retries=retries)
+
+    fetched = changed = inserted = updated = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        # pages are parsed here as they arrive while the pool fetches the next ones
+        for page, html in pool.map(fetch, pages):
+            fetched += 1
+            if not live.page_changed(page, html):
+                continue
+            changed += 1
+            page_inserted, page_updated = live.upsert(page, parse_results_page(html))
+            inserted += page_inserted
+            updated += page_updated
+    return PollResult(fetched, changed, inserted, updated)
+
+
+def run(live, output, pages, interval, polls=None, concurrency=4, rate=1.0, **options):
+    """Poll ``pages`` every ``interval`` seconds, rewriting ``output`` after every poll that changed a row.
+
+    Runs ``polls`` times, or until interrupted.
+    """
+    session = make_session(concurrency)
+    bucket = TokenBucket(rate, capacity=concurrency)
+    count = 0
+    while polls is None or count < polls:
+        if count:
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+        started = time.monotonic()
+        result = poll(live, pages, session, bucket, concurrency=concurrency, **options)
+        if result.inserted or result.updated:
+            live.write_csv(output)
+        count += 1
+        logger.info('poll %d: %d/%d pages changed, %d new and %d updated rows (%.1fs)', count,
+                    result.changed_pages, result.pages, result.inserted, result.updated,
+                    time.monotonic() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Poll live finishtime results into a CSV.')
+    parser.add_argument('--race-id', type=int, default=DEFAULT_PARAMS['RId'], help='finishtime RId')
+    parser.add_argument('--first-page', type=int, default=1)
+    parser.add_argument('--last-page', type=int, default=454)
+    parser.add_argument('--base-url', default=BASE_URL)
+    parser.add_argument('--interval', type=float, default=60.0, help='seconds between the starts of two polls')
+    parser.add_argument('--polls', type=int, help='stop after this many polls (default: run until interrupted)')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--rate', type=float, default=4.0, help='average requests per second')
+    parser.add_argument('--retries', type=int, default=5)
+    parser.add_argument('-o', '--output', default='comrades_2025_results.csv',
+                        help='results CSV to keep up to date, its rows are the starting point')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    live = LiveResults.from_csv(args.output)
+    try:
+        run(live, args.output, range(args.first_page, args.last_page + 1), args.interval, args.polls,
+            concurrency=args.concurrency, rate=args.rate, base_url=args.base_url,
+            params={**DEFAULT_PARAMS, 'RId': args.race_id}, retries=args.retries)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""On-disk cache of the raw results pages the scraper fetched.
+
+Every page is stored gzip compressed under the sha256 of its HTML, so a page
+that comes back unchanged is stored once. An append-only ``index.jsonl`` maps
+each page number to its latest content hash and to the ``ETag`` and
+``Last-Modified`` headers it was served with, which the scraper sends back on
+the next fetch so an unchanged page costs a 304 instead of a download::
+
+    .scrape/30205/pages/
+        index.jsonl
+        objects/3f/3f7c...e1.html.gz
+
+Fixing the parser then doesn't mean fetching the 454 pages again: the
+results can be rebuilt from the cache alone, parsing the pages in parallel
+across a process pool. The parsed pages go through a ``row_sink.RowSink``
+one at a time, like the scraper's, and the output is written from its
+segments, so memory stays flat however many pages are cached.
+
+    python page_cache.py .scrape/30205/pages -o comrades_2025_results.csv
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from results_parser import HEADERS, parse_results_page
+from row_sink import RowSink
+
+INDEX_FILE = 'index.jsonl'
+
+
+class PageCache:
+    """Cached pages of one race under ``directory``, safe to use from the scraper's threads."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self._lock = threading.Lock()
+        self._entries = {}  # page -> latest index record
+        os.makedirs(os.path.join(directory, 'objects'), exist_ok=True)
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # a line torn by an interrupted run
+                        continue
+                    self._entries[entry['page']] = entry
+
+    def __len__(self):
+        return len(self._entries)
+
+    def pages(self):
+        return sorted(self._entries)
+
+    def entry(self, page):
+        return self._entries.get(page)
+
+    def blob_path(self, digest):
+        return os.path.join(self.directory, 'objects', digest[:2], f'{digest}.html.gz')
+
+    def conditional_headers(self, page):
+        """Return the request headers that let the server answer 304 if ``page`` hasn't changed."""
+        entry = self._entries.get(page)
+        headers = {}
+        if entry is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def read(self, page):
+        """Return the cached HTML of ``page``."""
+        return read_blob(self.blob_path(self._entries[page]['sha256']))
+
+    def store(self, page, html, etag=None, last_modified=None):
+        """Store a freshly fetched ``page``, returns its content hash."""
+        data = html.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(gzip.compress(data, mtime=0))
+            os.replace(tmp_path, path)
+
+        entry = {'page': page, 'sha256': digest, 'etag': etag, 'last_modified': last_modified,
+                 'fetched': round(time.time(), 3)}
+        with self._lock:
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+            self._entries[page] = entry
+        return digest
+
+
+def read_blob(path):
+    with open(path, 'rb') as f:
+        return gzip.decompress(f.read()).decode('utf-8')
+
+
+def _parse_blob(path):
+    return parse_results_page(read_blob(path))
+
+
+def reparse(cache, sink, workers=None):
+    """Parse every cached page across a process pool into ``sink`` (a ``RowSink``), returns the number of rows."""
+    pages = cache.pages()
+    paths = [cache.blob_path(cache.entry(page)['sha256']) for page in pages]
+    rows = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parsed = pool.map(_parse_blob, paths, chunksize=max(1, len(paths) // (4 * (workers or os.cpu_count()))))
+        # written as each page comes back, in page order
+        for page, page_rows in zip(pages, parsed):
+            sink.write_page(page, page_rows)
+            rows += len(page_rows)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild a results file from cached pages, without fetching.')
+    parser.add_argument('cache_dir', help='page cache of one race, e.g. .scrape/30205/pages')
+    parser.add_argument('-o', '--output', default='comrades_2025_results.csv',
+                        help='CSV path, or a .arrow path for an Arrow IPC file')
+    parser.add_argument('--workers', type=int, help='parser processes (default: one per CPU)')
+    args = parser.parse_args()
+
+    cache = PageCache(args.cache_dir)
+    if not len(cache):
+        parser.error(f'no cached pages in {args.cache_dir}')
+    start = time.perf_counter()
+    # the parsed rows are only needed until the output is written
+    scratch = os.path.dirname(os.path.abspath(args.cache_dir))
+    with tempfile.TemporaryDirectory(prefix='reparse-', dir=scratch) as directory:
+        with RowSink(directory, HEADERS) as sink:
+            reparse(cache, sink, args.workers)
+        if os.path.dirname(args.output):
+            os.makedirs(os.path.dirname(args.output), exist_ok=True)
+        if args.output.endswith('.arrow'):
+            rows = sink.write_arrow(args.output)
+        else:
+            rows = sink.write_csv(args.output)
+    print(f'Parsed {len(cache)} pages into {rows} rows in {time.perf_counter() - start:.1f}s, '
+          f'wrote {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Type-ahead participant search over the results frame.
+
+The participant selectbox used to ship every unique name to the browser on
+each rerun and then find the chosen runner with a full-column string
+comparison, resolving duplicate names to whichever came first.
+``ParticipantIndex`` is built once per dataset version and answers
+
+* ``search(query)``: the top matches for a name fragment or race number,
+  from sorted prefix arrays over full names and name words, topped up with
+  trigram matches for typos and infix fragments, and
+* ``lookup(race_no)``: the unique row of a race number via a hash index.
+"""
+import unicodedata
+from bisect import bisect_left
+
+import numpy as np
+
+
+def normalize_name(name):
+    """Lower-case ``name``, strip accents and collapse whitespace."""
+    decomposed = unicodedata.normalize('NFKD', str(name))
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return ' '.join(stripped.casefold().split())
+
+
+def _trigrams(text):
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _sorted_keys(pairs):
+    pairs.sort()
+    return [key for key, _ in pairs], np.array([row for _, row in pairs], dtype=np.int32)
+
+
+class ParticipantIndex:
+    def __init__(self, df):
+        names = [normalize_name(name) for name in df['Name'].to_numpy(dtype=object)]
+        self.size = len(names)
+        self.race_numbers = df['Race No'].to_numpy(dtype=np.int64)
+        self.by_race_no = {race_no: row for row, race_no in enumerate(self.race_numbers.tolist())}
+
+        self._full_keys, self._full_rows = _sorted_keys([(name, row) for row, name in enumerate(names)])
+        self._word_keys, self._word_rows = _sorted_keys(
+            [(word, row) for row, name in enumerate(names) for word in set(name.replace('-', ' ').split())])
+
+        postings = {}
+        for row, name in enumerate(names):
+            for gram in _trigrams(name):
+                postings.setdefault(gram, []).append(row)
+        self._trigrams = {gram: np.array(rows, dtype=np.int32) for gram, rows in postings.items()}
+
+    def lookup(self, race_no):
+        """Return the row position of ``race_no``, or None if it isn't in the field."""
+        try:
+            return self.by_race_no.get(int(race_no))
+        except (TypeError, ValueError):
+            return None
+
+    def _prefix_rows(self, keys, rows, prefix):
+        lo = bisect_left(keys, prefix)
+        hi = bisect_left(keys, prefix + '\uffff', lo)
+        return rows[lo:hi]
+
+    def search(self, query, limit=10):
+        """Return up to ``limit`` row positions best matching ``query``.
+
+        An empty query returns the first rows of the frame (the leaders).
+        """
+        query = normalize_name(query)
+        if not query:
+            return list(range(min(limit, self.size)))
+
+        found = {}  # insertion ordered set of rows
+
+        def add(rows):
+            for row in rows:
+                if len(found) >= limit:
+                    return
+                found.setdefault(int(row), None)
+
+        if query.isdigit():
+            row = self.lookup(query)
+            if row is not None:
+                add([row])
+        add(self._prefix_rows(self._full_keys, self._full_rows, query))
+        add(self._prefix_rows(self._word_keys, self._word_rows, query))
+
+        if len(found) < limit and len(query) >= 3:
+            grams = [self._trigrams[gram] for gram in _trigrams(query) if gram in self._trigrams]
+            if grams:
+                counts = np.bincount(np.concatenate(grams), minlength=self.size)
+                # at least half the query's trigrams have to match
+                candidates = np.flatnonzero(counts >= max(1, len(_trigrams(query)) // 2))
+                best = candidates[np.argsort(-counts[candidates], kind='stable')]
+                add(best[:limit])
+        return list(found)
@@ -0,0 +1,235 @@
+"""Local JSON API over the prepared results, for tools other than the app.
+
+It answers the same questions as the app:
+
+* ``GET /participants?q=conyngham&limit=10``: participant search
+* ``GET /participants/10484``: one runner's times, positions and standings
+  (the ``race_cards`` card)
+* ``GET /counts/Status``, ``GET /counts/Country?top=5``: participants and
+  finishers per value of a rollup dimension
+* ``GET /standing?time=10:14:41&by=Category&value=Senior&gender=Male``: where
+  a finish time would place, overall or within a category (and gender, like
+  ``Cat Pos``), gender or wave
+* ``GET /health``: the edition and dataset version being served
+
+The parent process loads the results once, memory-mapped from the compiled
+Arrow artifact, and builds the participant index, rollups and rankings
+before forking ``--workers`` processes that accept on the same socket. The
+workers inherit all of it copy-on-write instead of each parsing the CSV and
+building their own. When the results file changes each worker moves to the
+new version on its next request, through ``results_loader``. Without
+``os.fork`` (Windows) the API runs in a single process.
+
+    python query_api.py --workers 4 --port 8080
+    curl 'http://127.0.0.1:8080/participants?q=conyngham'
+"""
+import argparse
+import json
+import os
+import signal
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+from participant_index import ParticipantIndex
+from race_cards import runner_card, wave_medians
+from rankings import SLICES, Rankings
+from results_catalog import CATALOG_DIR, Catalog
+from results_store import dataset_version
+from rollups import DIMENSIONS, Rollups
+from time_parsing import format_seconds, parse_times
+
+MAX_LIMIT = 100
+
+
+class QueryError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _int_param(params, name, default):
+    try:
+        return int(params.get(name, default))
+    except ValueError:
+        raise QueryError(400, f'{name} must be a whole number')
+
+
+class ResultsQueries:
+    """The API's queries over one catalog edition."""
+
+    def __init__(self, catalog, edition):
+        self.catalog = catalog
+        self.edition = edition
+        self.path = catalog[edition].path
+
+    # built once per dataset version and shared, like the app's derived objects
+    def _derived(self, name, build):
+        return self.catalog.load_derived(self.edition, name, build)
+
+    def warm(self):
+        """Load the results and build everything the queries use."""
+        for name, build in [('participant_index', ParticipantIndex), ('rollups', Rollups),
+                            ('rankings', Rankings), ('wave_medians', wave_medians)]:
+            self._derived(name, build)
+
+    def health(self):
+        return {'edition': self.edition, 'version': dataset_version(self.path),
+                'rows': len(self.catalog.load(self.edition))}
+
+    def search(self, query, limit):
+        df = self.catalog.load(self.edition)
+        rows = self._derived('participant_index', ParticipantIndex).search(query, limit=min(limit, MAX_LIMIT))
+        seconds = df['Time (seconds)'].to_numpy(dtype=float, na_value=float('nan'))[rows]
+        times = format_seconds(seconds)
+        return {'query': query, 'participants': [
+            {'race_no': int(df['Race No'].iat[row]), 'name': df['Name'].iat[row], 'category': df['Category'].iat[row],
+             'country': df['Country'].iat[row], 'status': df['Status'].iat[row], 'time': time or None}
+            for row, time in zip(rows, times)]}
+
+    def participant(self, race_no):
+        row = self._derived('participant_index', ParticipantIndex).lookup(race_no)
+        if row is None:
+            raise QueryError(404, f'no participant with race number {race_no}')
+        return runner_card(self.catalog.load(self.edition), self._derived('rankings', Rankings), row,
+                           self._derived('wave_medians', wave_medians))
+
+    def counts(self, dimension, top):
+        names = {name.casefold(): name for name in DIMENSIONS}
+        if dimension.casefold() not in names:
+            raise QueryError(404, f'unknown dimension {dimension!r}, one of {DIMENSIONS}')
+        dimension = names[dimension.casefold()]
+        rollups = self._derived('rollups', Rollups)
+        table = rollups.table(dimension)
+        if top:
+            table = table.head(top)
+        return {'dimension': dimension, 'total': rollups.total, 'finishers': rollups.finishers, 'values': [
+            {'value': None if value != value else str(value), 'count': int(row.count),
+             'finishers': int(row.finishers), 'finisher_ratio': float(row.finisher_ratio)}
+            for value, row in zip(table.index, table.itertuples(index=False))]}
+
+    def standing(self, time, by=None, value=None):
+        _, seconds = parse_times([time])
+        if seconds[0] != seconds[0]:
+            raise QueryError(400, 'time must be HH:MM:SS')
+        rankings = self._derived('rankings', Rankings)
+        if by is not None:
+            if by not in rankings.slices:
+                raise QueryError(404, f'by must be one of {list(rankings.slices)}')
+            if value not in rankings.slices[by]:
+                raise QueryError(404, f'no {by} {value!r}')
+        standing = rankings.standing(seconds[0], by=by, value=value)
+        return {'time': time, 'by': by, 'value': list(value) if isinstance(value, tuple) else value,
+                **standing._asdict()}
+
+    def route(self, path, params):
+        """Answer the query for a request ``path`` and its ``params``, raises ``QueryError``."""
+        parts = [unquote(part) for part in path.strip('/').split('/')]
+        if parts == ['health']:
+            return self.health()
+        if parts == ['participants']:
+            return self.search(params.get('q', ''), _int_param(params, 'limit', 10))
+        if len(parts) == 2 and parts[0] == 'participants':
+            if not parts[1].isdigit():
+                raise QueryError(400, 'race number must be a whole number')
+            return self.participant(int(parts[1]))
+        if len(parts) == 2 and parts[0] == 'counts':
+            return self.counts(parts[1], _int_param(params, 'top', 0))
+        if parts == ['standing']:
+            if 'time' not in params:
+                raise QueryError(400, 'time is required')
+            by, value = params.get('by'), params.get('value')
+            if by in SLICES and len(SLICES[by]) > 1:
+                # the other columns of the slice by their lowercased names, e.g. gender=Male
+                value = (value, *(params.get(column.lower()) for column in SLICES[by][1:]))
+            return self.standing(params['time'], by, value)
+        raise QueryError(404, f'no such endpoint {path}')
+
+
+def _make_handler(queries):
+    class Handler(BaseHTTPRequestHandler):
+        # keep-alive, clients reuse their connection
+        protocol_version = 'HTTP/1.1'
+        # the headers and the body go out as separate small writes, with Nagle's algorithm the body would
+        # wait for the client's delayed ACK of the headers, some 40 ms per request
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            try:
+                status, payload = 200, queries.route(url.path, params)
+            except QueryError as exc:
+                status, payload = exc.status, {'error': str(exc)}
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(queries, host='127.0.0.1', port=8080, workers=1):
+    """Serve ``queries`` until interrupted, from ``workers`` forked processes sharing one socket."""
+    queries.warm()
+    server = ThreadingHTTPServer((host, port), _make_handler(queries))
+    server.daemon_threads = True
+    if workers <= 1 or not hasattr(os, 'fork'):
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                os._exit(0)
+        children.append(pid)
+
+    def stop(*_):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        sys.exit(0)
+
+    # the workers go down with the parent
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        for pid in children:
+            os.waitpid(pid, 0)
+    except KeyboardInterrupt:
+        stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve participant, count and standing queries as JSON.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='worker processes (default: one per CPU)')
+    parser.add_argument('--edition', help='catalog edition, e.g. 2025-down (default: the newest)')
+    parser.add_argument('--catalog', default=CATALOG_DIR, help='results catalog directory')
+    args = parser.parse_args()
+
+    catalog = Catalog.open(args.catalog)
+    edition = args.edition or next(iter(catalog.partitions))
+    print(f'Serving {edition} at http://{args.host}:{args.port}/ with {args.workers} workers', flush=True)
+    serve(ResultsQueries(catalog, edition), args.host, args.port, args.workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,309 @@
+"""Static race cards for a batch of runners, e.g. every member of a club.
+
+A card shows a runner's finish time, their standing overall, in their
+category, gender and wave, how they did against their wave's median and
+where they land on the distribution of finish times. Cards are written as
+JSON, HTML (with the interactive chart) and PNG.
+
+The cards are rendered across a process pool. Every worker loads the results
+once (memory-mapped, see ``results_store``), builds the rankings once and
+one base chart per format: the binned overall strip plot for HTML, already
+serialized, and a matplotlib histogram for PNG. A card only adds the
+runner's line to the serialized chart, or moves the line and labels on the
+worker's PNG figure, instead of building a figure per runner.
+
+    python race_cards.py --club "Durban Harriers" -o cards
+    python race_cards.py --race-no 10484 28951 --format json html
+"""
+import argparse
+import html
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.image import imsave
+from plotly.offline import get_plotlyjs_version
+
+from charts import add_participant_line, bin_edges, overall_strip_figure
+from cut_offs import CUT_OFFS
+from rankings import Rankings
+from results_catalog import CATALOG_DIR, Catalog
+from results_loader import load_results
+from results_store import finish_hours
+from time_parsing import format_seconds
+
+FORMATS = ['json', 'html', 'png']
+
+_STANDINGS = {'overall': None, 'category': 'Category', 'gender': 'Gender', 'wave': 'Wave Number'}
+
+_HTML = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script src="https://cdn.plot.ly/plotly-{plotly_version}.min.js"></script>
+<style>
+body {{ font-family: sans-serif; max-width: 900px; margin: auto }}
+.cards {{ display: flex; gap: 10px }}
+.card {{ flex: 1; text-align: center; border: 2px solid #ccc; border-radius: 10px; padding: 10px }}
+.card h1 {{ font-size: 32px; margin: 10px 0 }}
+</style>
+</head>
+<body>
+<h1>{name}</h1>
+<p>{details}</p>
+<div class="cards">{cards}</div>
+<div id="chart"></div>
+<script>
+const figure = {figure};
+const runner = {overlay};
+figure.layout.shapes = (figure.layout.shapes || []).concat(runner.shapes || []);
+figure.layout.annotations = (figure.layout.annotations || []).concat(runner.annotations || []);
+Plotly.newPlot('chart', figure.data, figure.layout, {{responsive: true}});
+</script>
+</body>
+</html>
+"""
+
+# JSON is embedded in a <script> block, where a "</script>" inside a string (say, a runner's name) would end it
+_SCRIPT_ESCAPES = str.maketrans({'<': '\\u003c', '>': '\\u003e', '&': '\\u0026'})
+
+
+def _script_json(text):
+    """Return the JSON ``text`` with ``<``, ``>`` and ``&`` escaped, safe to embed in a ``<script>`` block."""
+    return text.translate(_SCRIPT_ESCAPES)
+
+
+_worker = None  # the _CardRenderer of this worker process
+
+
+def select_runners(df, clubs=(), countries=(), race_numbers=()):
+    """Return the race numbers of the runners matching every filter given.
+
+    Clubs and countries match case-insensitively, countries by name or by
+    flag code (``ZA``).
+    """
+    selected = np.ones(len(df), dtype=bool)
+    if clubs:
+        selected &= df['Club'].str.casefold().isin([club.casefold() for club in clubs]).to_numpy()
+    if countries:
+        wanted = [country.casefold() for country in countries]
+        selected &= (df['Country'].str.casefold().isin(wanted) | df['Flag'].str.casefold().isin(wanted)).to_numpy()
+    if race_numbers:
+        selected &= df['Race No'].isin(race_numbers).to_numpy(dtype=bool, na_value=False)
+    return df['Race No'].to_numpy()[selected].tolist()
+
+
+def _number(value):
+    return None if pd.isna(value) else int(value)
+
+
+def _text(value):
+    return None if pd.isna(value) else str(value)
+
+
+def wave_medians(df):
+    """Return the median finish time in hours of every wave group."""
+    return pd.Series(finish_hours(df)).groupby(df['Wave Number'].to_numpy()).median().to_dict()
+
+
+def runner_card(df, rankings, row, medians):
+    """Return the card of the runner at row position ``row`` as a JSON-ready dict.
+
+    ``rankings`` are the ``Rankings`` of ``df`` and ``medians`` its ``wave_medians``.
+    """
+    details = df.iloc[row]
+    seconds = details['Time (seconds)']
+    finished = pd.notna(seconds)
+    standings = {}
+    for name, by in _STANDINGS.items():
+        standing = rankings.row_standing(row, by=by)
+        standings[name] = None if standing is None else standing._asdict()
+    wave = _text(details['Wave Number'])
+    wave_median = medians.get(wave, np.nan) * 3600
+    return {
+        'race_no': int(details['Race No']),
+        'name': details['Name'],
+        'club': _text(details['Club']),
+        'country': _text(details['Country']),
+        'category': _text(details['Category']),
+        'gender': _text(details['Gender']),
+        'wave': _text(details['Wave']),
+        'wave_group': wave,
+        'status': details['Status'],
+        'time': format_seconds([seconds])[0] if finished else None,
+        'net_time': format_seconds([details['Net Time (seconds)']])[0] if finished else None,
+        'seconds': _number(seconds),
+        'position': {'overall': _number(details['Pos']), 'category': _number(details['Cat Pos']),
+                     'gender': _number(details['Gen Pos'])},
+        'standing': standings,
+        'wave_median': format_seconds([wave_median])[0] or None,
+        'seconds_vs_wave_median': (int(seconds - round(wave_median))
+                                   if finished and not np.isnan(wave_median) else None),
+    }
+
+
+class _CardRenderer:
+    """Everything a worker shares between the cards it renders."""
+
+    def __init__(self, path, year, formats, out_dir):
+        self.df = load_results(path)
+        self.year = year
+        self.formats = formats
+        self.out_dir = out_dir
+        self.rankings = Rankings(self.df)
+        self.rows = pd.Index(self.df['Race No'].to_numpy())
+        self.wave_medians = wave_medians(self.df)
+        hours = finish_hours(self.df)
+        if 'html' in formats:
+            # binned, so each card carries a few kB of chart instead of every runner
+            figure = overall_strip_figure(self.df, 'density', f'Finish Times at Comrades Marathon {year}')
+            self.figure_json = _script_json(pio.to_json(figure, validate=False))
+        if 'png' in formats:
+            self._build_png_figure(hours[~np.isnan(hours)])
+
+    def _build_png_figure(self, hours):
+        self.png = Figure(figsize=(6, 8), dpi=100)
+        FigureCanvasAgg(self.png)
+        ax = self.png.add_axes([0.15, 0.07, 0.8, 0.7])
+        edges = bin_edges(hours)
+        counts, _ = np.histogram(hours, bins=edges)
+        ax.barh(edges[:-1], counts, height=np.diff(edges), align='edge', color='#636efa')
+        for cut_off in CUT_OFFS:
+            ax.axhline(cut_off.hours, color='black', linewidth=0.6, linestyle='--')
+            ax.text(1, cut_off.hours, cut_off.label, transform=ax.get_yaxis_transform(), ha='right', va='bottom',
+                    fontsize=7)
+        ax.set_ylim(edges[-1], edges[0])
+        ax.set_ylabel('Finish time (hours)')
+        ax.set_xlabel('Number of participants')
+        # the runner's artists are animated, i.e. left out of the background drawn once here
+        self.png_line = ax.axhline(0, color='orange', linewidth=3, animated=True)
+        self.png_title = self.png.text(0.5, 0.95, '', ha='center', va='top', fontsize=16, weight='bold',
+                                       animated=True)
+        self.png_lines = self.png.text(0.5, 0.89, '', ha='center', va='top', fontsize=10, linespacing=1.6,
+                                       animated=True)
+        self.png.canvas.draw()
+        self.png_background = self.png.canvas.copy_from_bbox(self.png.bbox)
+
+    def card(self, race_no):
+        """Return the card of ``race_no`` as a JSON-ready dict."""
+        return runner_card(self.df, self.rankings, self.rows.get_loc(race_no), self.wave_medians)
+
+    def render(self, race_no):
+        card = self.card(race_no)
+        path = os.path.join(self.out_dir, str(card['race_no']))
+        if 'json' in self.formats:
+            with open(f'{path}.json', 'w', encoding='utf-8') as f:
+                json.dump(card, f, indent=1)
+        if 'html' in self.formats:
+            with open(f'{path}.html', 'w', encoding='utf-8') as f:
+                f.write(self._html(card))
+        if 'png' in self.formats:
+            self._png(card, f'{path}.png')
+
+    def _headline(self, card):
+        # (label, value) of the stat boxes on the HTML and PNG cards
+        if card['time'] is None:
+            return [('Status', card['status'])]
+        boxes = [('Time', card['time']), ('Position', f"{card['position']['overall']:,}")]
+        for name in ['category', 'gender', 'wave']:
+            standing = card['standing'][name]
+            if standing is not None:
+                boxes.append((f'{name.capitalize()} rank',
+                              f"{standing['rank']:,} of {standing['entrants']:,} (top {standing['percentile']:.0%})"))
+        return boxes
+
+    def _html(self, card):
+        overlay = go.Figure()
+        add_participant_line(overlay, {'Time (seconds)': card['seconds'] if card['seconds'] is not None else np.nan,
+                                       'Name': card['name']})
+        details = ' · '.join(html.escape(str(value)) for value in
+                             [f"#{card['race_no']}", card['category'], card['gender'], card['wave'], card['club'],
+                              card['country']] if value)
+        if card['seconds_vs_wave_median'] is not None:
+            ahead = card['seconds_vs_wave_median']
+            details += (f"<br>{format_seconds([abs(ahead)])[0]} {'faster' if ahead <= 0 else 'slower'} "
+                        f"than the {html.escape(str(card['wave_group']))} median of {card['wave_median']}")
+        cards = ''.join(f'<div class="card"><h3>{html.escape(label)}</h3><h1>{html.escape(str(value))}</h1></div>'
+                        for label, value in self._headline(card))
+        return _HTML.format(title=html.escape(f"{card['name']} - Comrades {self.year}"),
+                            plotly_version=get_plotlyjs_version(), name=html.escape(card['name']),
+                            details=details, cards=cards, figure=self.figure_json,
+                            overlay=_script_json(json.dumps(
+                                {'shapes': [shape.to_plotly_json() for shape in overlay.layout.shapes],
+                                 'annotations': [annotation.to_plotly_json()
+                                                 for annotation in overlay.layout.annotations]})))
+
+    def _png(self, card, path):
+        self.png_title.set_text(f"{card['name']}  #{card['race_no']}")
+        self.png_lines.set_text('\n'.join(f'{label}: {value}' for label, value in self._headline(card)))
+        self.png_line.set_visible(card['seconds'] is not None)
+        if card['seconds'] is not None:
+            self.png_line.set_ydata([card['seconds'] / 3600] * 2)
+        # blit the runner's artists onto the worker's background instead of redrawing the chart
+        canvas = self.png.canvas
+        canvas.restore_region(self.png_background)
+        for artist in (self.png_line, self.png_title, self.png_lines):
+            self.png.draw_artist(artist)
+        imsave(path, np.asarray(canvas.buffer_rgba()))
+
+
+def _init_worker(path, year, formats, out_dir):
+    global _worker
+    _worker = _CardRenderer(path, year, formats, out_dir)
+
+
+def _render_batch(race_numbers):
+    for race_no in race_numbers:
+        _worker.render(race_no)
+    return len(race_numbers)
+
+
+def export_cards(path, year, race_numbers, out_dir, formats=FORMATS, workers=None):
+    """Render the cards of ``race_numbers`` into ``out_dir`` across a process pool, returns how many were written."""
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count()
+    # a few batches per worker keeps them all busy without a round trip per card
+    size = max(1, -(-len(race_numbers) // (workers * 4)))
+    batches = [race_numbers[i:i + size] for i in range(0, len(race_numbers), size)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(path, year, list(formats), out_dir)) as pool:
+        return sum(pool.map(_render_batch, batches))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write race cards for a club, a country or a list of runners.')
+    parser.add_argument('--club', action='append', default=[], help='club name, can be repeated')
+    parser.add_argument('--country', action='append', default=[], help='country name or flag code, can be repeated')
+    parser.add_argument('--race-no', type=int, nargs='+', default=[], help='race numbers')
+    parser.add_argument('--format', nargs='+', choices=FORMATS, default=FORMATS, dest='formats')
+    parser.add_argument('--edition', help='catalog edition, e.g. 2025-down (default: the newest)')
+    parser.add_argument('--catalog', default=CATALOG_DIR, help='results catalog directory')
+    parser.add_argument('-o', '--output', default='race_cards', help='directory to write the cards to')
+    parser.add_argument('--workers', type=int, help='worker processes (default: one per CPU)')
+    args = parser.parse_args()
+    if not (args.club or args.country or args.race_no):
+        parser.error('pick the runners with --club, --country or --race-no')
+
+    catalog = Catalog.open(args.catalog)
+    partition = catalog[args.edition or next(iter(catalog.partitions))]
+    race_numbers = select_runners(load_results(partition.path), args.club, args.country, args.race_no)
+    if not race_numbers:
+        parser.error('no runners match')
+
+    start = time.perf_counter()
+    written = export_cards(partition.path, partition.year, race_numbers, args.output, args.formats, args.workers)
+    elapsed = time.perf_counter() - start
+    print(f'Wrote {written} race cards ({", ".join(args.formats)}) to {args.output} in {elapsed:.1f}s, '
+          f'{written / elapsed:.1f} runners/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+"""Where a finish time stands in the field, answered from sorted arrays.
+
+The percentile columns in ``app_ignore.py`` were recomputed over the whole
+frame on every rerun just to show one runner's values. ``Rankings`` keeps the
+finish times sorted once per dataset version, overall and per value of each
+column in ``SLICES``, and answers rank, percentile and "how many beaten" for
+a row or for any hypothetical time with a binary search.
+
+Ranks follow the gun time (the ``Time`` column) like the official ``Pos``,
+but tied times share a rank (one plus the number of strictly faster
+finishers). Non-finishers are part of the field and count as beaten by every
+finisher, so overall ``percentile`` for a finisher equals ``Pos / entrants``
+up to ties. The ``'Category'`` slice ranks runners within their category and
+gender, the population the official ``Cat Pos`` counts in, so its rank
+matches ``Cat Pos`` up to ties.
+
+When the results file changes, ``updated`` takes the changed rows' old times
+out of the sorted arrays and merges their new times in, instead of sorting
+the field again.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from results_store import finish_seconds
+
+# slice name -> the columns whose values a runner shares with the others in their slice
+SLICES = {'Category': ['Category', 'Gender'], 'Gender': ['Gender'], 'Wave Number': ['Wave Number']}
+
+Standing = namedtuple('Standing', ['rank', 'finishers', 'entrants', 'beaten', 'percentile', 'fraction_beaten'])
+
+
+class _Slice:
+    def __init__(self, times, entrants):
+        self.times = times  # sorted finish seconds
+        self.entrants = entrants
+
+    def standing(self, seconds):
+        rank = int(np.searchsorted(self.times, seconds, side='left')) + 1
+        beaten = self.entrants - int(np.searchsorted(self.times, seconds, side='right'))
+        return Standing(rank=rank, finishers=len(self.times), entrants=self.entrants, beaten=beaten,
+                        percentile=rank / self.entrants,
+                        fraction_beaten=beaten / (self.entrants - 1) if self.entrants > 1 else 1.0)
+
+    def updated(self, removed, added, entrants):
+        # removed/added are the finish seconds (NaN for non-finishers) of the rows that changed
+        removed = np.sort(removed[~np.isnan(removed)])
+        added = np.sort(added[~np.isnan(added)])
+        times = self.times
+        if len(removed):
+            # equal times map to consecutive positions, the n-th copy of a time to first + n
+            first = np.searchsorted(times, removed, side='left')
+            times = np.delete(times, first + np.arange(len(removed)) - np.searchsorted(removed, removed, side='left'))
+        if len(added):
+            times = np.insert(times, np.searchsorted(times, added), added)
+        return _Slice(times, entrants)
+
+
+_EMPTY = _Slice(np.empty(0), 0)
+_NO_ROWS = np.empty(0, dtype=np.intp)
+
+
+def _column_codes(column):
+    # a categorical's own codes, its categories are already sorted, other columns are factorized
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.array.codes, column.array.categories
+    return pd.factorize(column, sort=True)
+
+
+def _factorize(df, columns):
+    """Return per row codes (-1 where any of ``columns`` is missing) and the sorted values they index.
+
+    With several columns the values are tuples, in the order of the first column, then the second, ...
+    """
+    parts = [_column_codes(df[column]) for column in columns]
+    sizes = [len(values) for _, values in parts]
+    key = np.zeros(len(df), dtype=np.int64)
+    missing = np.zeros(len(df), dtype=bool)
+    for codes, values in parts:
+        key = key * len(values) + codes
+        missing |= codes < 0
+    key[missing] = 0
+    # the values that occur, in sorted order, from one count over every possible value
+    keys = np.flatnonzero(np.bincount(key[~missing], minlength=int(np.prod(sizes))))
+    lookup = np.full(int(np.prod(sizes)), -1, dtype=np.intp)
+    lookup[keys] = np.arange(len(keys))
+    codes = np.where(missing, -1, lookup[key])
+    if len(columns) == 1:
+        return codes, parts[0][1][keys]
+    digits = np.unravel_index(keys, sizes)
+    return codes, list(zip(*(values[d].tolist() for (_, values), d in zip(parts, digits))))
+
+
+def _positions(df, columns):
+    # slice value -> positions of the rows of ``df`` in that slice
+    codes, values = _factorize(df, columns)
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(len(values) + 1))
+    return {value: order[bounds[code]:bounds[code + 1]] for code, value in enumerate(values)}
+
+
+class Rankings:
+    def __init__(self, df, slices=SLICES):
+        self.seconds = finish_seconds(df)
+        finished = ~np.isnan(self.seconds)
+        self.overall = _Slice(np.sort(self.seconds[finished]), len(df))
+
+        self.columns = dict(slices)  # slice name -> its columns
+        self.codes = {}  # slice name -> (per row code into values, -1 where missing; values)
+        self.slices = {}  # slice name -> {value: _Slice}
+        for name, columns in self.columns.items():
+            codes, values = _factorize(df, columns)
+            entrants = np.bincount(codes[codes >= 0], minlength=len(values))
+            # one sort by (code, time) and then split per code instead of sorting every slice
+            ranked = finished & (codes >= 0)
+            order = np.lexsort((self.seconds[ranked], codes[ranked]))
+            sorted_times = self.seconds[ranked][order]
+            bounds = np.searchsorted(codes[ranked][order], np.arange(len(values) + 1))
+            self.slices[name] = {value: _Slice(sorted_times[bounds[code]:bounds[code + 1]], int(entrants[code]))
+                                 for code, value in enumerate(values)}
+            self.codes[name] = (codes, values)
+
+    def updated(self, df, delta):
+        """Return the rankings of ``df``, given these are the rankings of ``df`` before ``delta``.
+
+        The per row codes are read off ``df``'s categorical codes, the sorted
+        times of the overall field and of every slice a row in ``delta`` (a
+        ``results_store.ResultsDelta``) left or joined are merged with the
+        changed rows' times in place of a sort, the other slices are shared
+        with these rankings.
+        """
+        rankings = Rankings.__new__(Rankings)
+        rankings.seconds = finish_seconds(df)
+        removed, added = finish_seconds(delta.removed), finish_seconds(delta.added)
+        rankings.overall = self.overall.updated(removed, added, len(df))
+
+        rankings.columns = self.columns
+        rankings.codes = {}
+        rankings.slices = {}
+        for name, old_slices in self.slices.items():
+            columns = self.columns[name]
+            codes, values = _factorize(df, columns)
+            rankings.codes[name] = (codes, values)
+            removed_at = _positions(delta.removed, columns)
+            added_at = _positions(delta.added, columns)
+            slices = {}
+            for value in values:
+                out = removed_at.get(value, _NO_ROWS)
+                into = added_at.get(value, _NO_ROWS)
+                old = old_slices.get(value, _EMPTY)
+                if len(out) or len(into):
+                    slices[value] = old.updated(removed[out], added[into], old.entrants - len(out) + len(into))
+                else:
+                    slices[value] = old
+            rankings.slices[name] = slices
+        return rankings
+
+    @property
+    def delta_columns(self):
+        # the columns whose changes ``updated`` has to be told about
+        return ['Time (seconds)'] + list(dict.fromkeys(column for columns in self.columns.values()
+                                                       for column in columns))
+
+    def _slice(self, by, value):
+        if by is None:
+            return self.overall
+        return self.slices[by][value]
+
+    def standing(self, seconds, by=None, value=None):
+        """Return the ``Standing`` a finish time of ``seconds`` would have.
+
+        With ``by`` (one of ``SLICES``) the time is ranked among the runners
+        whose ``by`` columns equal ``value`` (a tuple for a slice of several
+        columns, e.g. ``('Senior', 'Male')`` for ``'Category'``), otherwise in
+        the whole field.
+        """
+        return self._slice(by, value).standing(seconds)
+
+    def row_standing(self, row, by=None):
+        """Return the ``Standing`` of the runner at row position ``row``, or None if they didn't finish.
+
+        With ``by`` the runner is ranked within their own ``by`` slice.
+        """
+        seconds = self.seconds[row]
+        if np.isnan(seconds):
+            return None
+        if by is None:
+            return self.overall.standing(seconds)
+        codes, values = self.codes[by]
+        if codes[row] < 0:
+            return None
+        return self.slices[by][values[codes[row]]].standing(seconds)
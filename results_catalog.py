@@ -0,0 +1,271 @@
+"""Results for many race editions, partitioned by year and direction.
+
+A catalog directory holds one results CSV per edition and a ``catalog.json``
+listing them::
+
+    data/
+        catalog.json
+        2024-up/results.csv
+        2025-down/results.csv
+        runners.arrow
+
+    {"partitions": [{"year": 2025, "race": "down", "race_id": 30205, "path": "2025-down/results.csv"}, ...]}
+
+Partitions are only read when asked for. ``Catalog.load`` goes through
+``results_loader``, so each one is compiled to its Arrow artifact once,
+shared across sessions and evicted least recently used first when the cached
+frames and the objects derived from them exceed ``results_loader.CACHE_MAX_BYTES``.
+
+Questions that span editions, like a runner's history, are answered by the
+``RunnerIndex`` in ``runners.arrow``. It holds a handful of columns per
+runner from every partition and is rebuilt when any partition changes. It is
+built from column reads of the memory-mapped artifacts, not from the full
+frames.
+
+Without a ``catalog.json`` the catalog holds just the bundled 2025 results.
+
+    python results_catalog.py add 2024 up data/2024-up/results.csv --race-id 24021
+    python results_catalog.py list
+"""
+import argparse
+import json
+import os
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from participant_index import normalize_name
+from results_loader import DEFAULT_RESULTS_PATH, load_derived, load_results
+from results_store import dataset_version, read_table
+from time_parsing import format_seconds, status_labels
+
+CATALOG_DIR = os.environ.get('COMRADES_DATA_DIR', 'data')
+CATALOG_FILE = 'catalog.json'
+INDEX_FILE = 'runners.arrow'
+INDEX_FORMAT = 1
+
+RACES = ['up', 'down']
+
+Partition = namedtuple('Partition', ['key', 'year', 'race', 'race_id', 'path'])
+
+DEFAULT_PARTITION = Partition('2025-down', 2025, 'down', 30205, DEFAULT_RESULTS_PATH)
+
+_INDEX_COLUMNS = ['Race No', 'Name', 'Status', 'Time', 'Pos']
+
+_indexes = {}  # (catalog root, partition versions) -> RunnerIndex
+_index_lock = threading.Lock()
+
+
+def partition_key(year, race):
+    return f'{year}-{race}'
+
+
+def partition_label(partition):
+    return f'{partition.year} {partition.race.capitalize()} Run'
+
+
+class Catalog:
+    def __init__(self, root, partitions):
+        self.root = root
+        # newest edition first
+        self.partitions = {p.key: p for p in sorted(partitions, key=lambda p: (-p.year, p.race))}
+
+    @classmethod
+    def open(cls, root=CATALOG_DIR):
+        """Read the catalog in ``root``, or the default single-edition catalog if there is none."""
+        try:
+            with open(os.path.join(root, CATALOG_FILE), encoding='utf-8') as f:
+                entries = json.load(f)['partitions']
+        except FileNotFoundError:
+            return cls(root, [DEFAULT_PARTITION])
+        return cls(root, [Partition(partition_key(e['year'], e['race']), int(e['year']), e['race'],
+                                    e.get('race_id'), os.path.join(root, e['path']))
+                          for e in entries])
+
+    def save(self):
+        os.makedirs(self.root, exist_ok=True)
+        entries = [{'year': p.year, 'race': p.race, 'race_id': p.race_id,
+                    'path': os.path.relpath(p.path, self.root)} for p in self.partitions.values()]
+        path = os.path.join(self.root, CATALOG_FILE)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'partitions': entries}, f, indent=1)
+        os.replace(tmp_path, path)
+
+    def add(self, year, race, path, race_id=None):
+        """Register (or replace) the results CSV at ``path`` for one edition, call ``save`` to persist."""
+        if race not in RACES:
+            raise ValueError(f'race must be one of {RACES}, not {race!r}')
+        partition = Partition(partition_key(year, race), int(year), race, race_id, path)
+        self.partitions[partition.key] = partition
+        self.partitions = {p.key: p for p in sorted(self.partitions.values(), key=lambda p: (-p.year, p.race))}
+        return partition
+
+    def __getitem__(self, key):
+        return self.partitions[key]
+
+    def __iter__(self):
+        return iter(self.partitions.values())
+
+    def __len__(self):
+        return len(self.partitions)
+
+    def load(self, key):
+        """Return the prepared, read-only results frame of one edition."""
+        return load_results(self.partitions[key].path)
+
+    def load_derived(self, key, name, build):
+        """``results_loader.load_derived`` for one edition."""
+        return load_derived(name, build, self.partitions[key].path)
+
+    def versions(self):
+        return {key: dataset_version(p.path) for key, p in self.partitions.items()}
+
+    def runner_index(self):
+        """Return the cross-edition ``RunnerIndex``, rebuilding it if any partition changed."""
+        versions = self.versions()
+        cache_key = (os.path.abspath(self.root), tuple(sorted(versions.items())))
+        with _index_lock:
+            if cache_key not in _indexes:
+                table = self._read_index(versions)
+                if table is None:
+                    table = self._build_index(versions)
+                _indexes.clear()
+                _indexes[cache_key] = RunnerIndex(table, self.partitions)
+            return _indexes[cache_key]
+
+    def _index_path(self):
+        return os.path.join(self.root, INDEX_FILE)
+
+    def _read_index(self, versions):
+        try:
+            table = feather.read_table(self._index_path(), memory_map=True)
+        except (OSError, pa.ArrowInvalid):
+            return None
+        metadata = table.schema.metadata or {}
+        if (metadata.get(b'format') != str(INDEX_FORMAT).encode()
+                or json.loads(metadata.get(b'versions', b'{}')) != versions):
+            return None
+        return table
+
+    def _build_index(self, versions):
+        pieces = []
+        for key, partition in self.partitions.items():
+            table = read_table(partition.path, columns=_INDEX_COLUMNS)
+            names = table['Name'].to_pylist()
+            pieces.append(pa.table({
+                'partition': pa.array([key] * len(names), type=pa.string()).dictionary_encode(),
+                'row': pa.array(np.arange(len(names), dtype=np.int32)),
+                'race_no': table['Race No'],
+                'name': table['Name'],
+                'name_key': pa.array([normalize_name(name) for name in names], type=pa.string()),
+                'status': table['Status'],
+                'seconds': table['Time'],
+                'pos': table['Pos'],
+            }))
+        table = pa.concat_tables(pieces).sort_by('name_key').replace_schema_metadata(
+            {'format': str(INDEX_FORMAT), 'versions': json.dumps(versions)})
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            tmp_path = f'{self._index_path()}.{os.getpid()}.tmp'
+            feather.write_feather(table, tmp_path, compression='uncompressed')
+            os.replace(tmp_path, self._index_path())
+        except OSError:
+            pass  # read-only checkout, keep the index in memory only
+        return table
+
+
+class RunnerIndex:
+    """Every runner of every edition, sorted by normalized name."""
+
+    def __init__(self, table, partitions):
+        self.table = table
+        self.partitions = partitions
+        self.size = table.num_rows
+        self._name_keys = table['name_key'].to_numpy(zero_copy_only=False)
+        self._race_numbers = table['race_no'].to_numpy(zero_copy_only=False)
+        partitions = table['partition'].combine_chunks()
+        self._partition_codes = partitions.indices.to_numpy(zero_copy_only=False)
+        self._partition_names = partitions.dictionary.to_pylist()
+        self._rows = table['row'].to_numpy()
+        self._by_race_no = np.argsort(self._race_numbers, kind='stable')
+        self._sorted_race_numbers = self._race_numbers[self._by_race_no]
+
+    def _rows_for_name(self, name):
+        key = normalize_name(name)
+        lo = np.searchsorted(self._name_keys, key, side='left')
+        hi = np.searchsorted(self._name_keys, key, side='right')
+        return np.arange(lo, hi)
+
+    def _rows_for_race_no(self, race_no):
+        lo = np.searchsorted(self._sorted_race_numbers, race_no, side='left')
+        hi = np.searchsorted(self._sorted_race_numbers, race_no, side='right')
+        return self._by_race_no[lo:hi]
+
+    def history(self, name=None, race_no=None, edition=None, row=None):
+        """Return every result of a runner, by full name and/or race number, newest edition first.
+
+        With ``edition`` and ``row`` (the runner's row position in that
+        edition) the runner's own result stands for that edition, whatever
+        the name and race number match, and namesakes in it are left out.
+        Only the index is read, no partition is loaded.
+        """
+        if name is None and race_no is None:
+            raise ValueError('give a name, a race number or both')
+        rows = self._rows_for_name(name) if name is not None else None
+        if race_no is not None:
+            by_number = self._rows_for_race_no(int(race_no))
+            rows = by_number if rows is None else np.intersect1d(rows, by_number)
+        if edition is not None:
+            code = self._partition_names.index(edition)
+            rows = np.asarray(rows)[self._partition_codes[rows] != code]
+            rows = np.concatenate([rows, np.flatnonzero((self._partition_codes == code) & (self._rows == row))])
+
+        found = self.table.take(pa.array(np.asarray(rows, dtype=np.int64))).to_pandas()
+        partitions = [self.partitions[key] for key in found['partition'].astype(str)]
+        seconds = found['seconds'].to_numpy(dtype='float64', na_value=np.nan)
+        history = pd.DataFrame({
+            'Year': [p.year for p in partitions],
+            'Race': [p.race.capitalize() for p in partitions],
+            'Race No': found['race_no'].to_numpy(),
+            'Name': found['name'].to_numpy(),
+            'Status': status_labels(found['status'].to_numpy()),
+            'Time': format_seconds(seconds),
+            'Pos': found['pos'].astype('Int32').array,
+            'partition': found['partition'].astype(str).to_numpy(),
+            'row': found['row'].to_numpy(),
+        })
+        return history.sort_values(['Year', 'Race'], ascending=[False, True], ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage the catalog of partitioned race results.')
+    parser.add_argument('--root', default=CATALOG_DIR, help='catalog directory')
+    commands = parser.add_subparsers(dest='command', required=True)
+    add = commands.add_parser('add', help='register a results CSV for one edition')
+    add.add_argument('year', type=int)
+    add.add_argument('race', choices=RACES)
+    add.add_argument('path', help='results CSV, normally <root>/<year>-<race>/results.csv')
+    add.add_argument('--race-id', type=int, help='finishtime RId the results were scraped from')
+    commands.add_parser('list', help='list the editions in the catalog')
+    commands.add_parser('index', help='rebuild the cross-edition runner index')
+    args = parser.parse_args()
+
+    catalog = Catalog.open(args.root)
+    if args.command == 'add':
+        partition = catalog.add(args.year, args.race, args.path, race_id=args.race_id)
+        catalog.save()
+        print(f'Added {partition.key} ({partition.path})')
+    elif args.command == 'list':
+        for partition in catalog:
+            print(f'{partition.key:<10} RId {partition.race_id or "-":<6} {partition.path}')
+    else:
+        print(f'Indexed {catalog.runner_index().size:,} results from {len(catalog)} editions')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,245 @@
+"""Load the Comrades results once per data file and share them across sessions.
+
+Streamlit reruns ``app.py`` top to bottom on every widget interaction, so the
+CSV parse and all of the derived columns used to be rebuilt on every click.
+``load_results`` does that work once per version of the data file (reading
+the compiled artifact from ``results_store`` when it is up to date) and keeps
+the prepared frame in a process-wide cache that every session reads from.
+
+When a file changes under a running app (e.g. ``live_ingest.py`` on race
+day), derived objects that can update themselves, i.e. that have
+``updated(frame, delta)`` and ``delta_columns``, are carried over to the new
+version and moved by the rows that changed rather than built again, unless
+most of the rows changed, when building them again is as quick.
+"""
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from plotly.basedatatypes import BaseFigure
+
+from results_store import dataset_version, diff_results, forget_version, load_frame
+
+DEFAULT_RESULTS_PATH = 'comrades_2025_results.csv'
+
+# upper bound (bytes) on the memory held by cached frames and the objects
+# derived from them, the most recently used frame is always kept even if it is
+# bigger than the budget on its own
+CACHE_MAX_BYTES = int(os.environ.get('COMRADES_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+# object array items looked at to estimate a derived object's size
+_SIZE_SAMPLE = 1000
+
+# derived objects are built again rather than updated once the old and new
+# copies of the changed rows add up to this share of the frame, where an update
+# costs as much as a build
+_MAX_DELTA_SHARE = 0.5
+
+_cache = OrderedDict()  # (path, version) -> _Entry
+_cache_lock = threading.Lock()
+# re-entrant so a derived builder can itself ask for other derived objects
+_build_lock = threading.RLock()
+
+
+class _Entry:
+    def __init__(self, frame, size, frame_arrays):
+        self.frame = frame
+        self.size = size  # bytes of the frame and, as they are built, its derived objects
+        self.frame_arrays = frame_arrays  # ids of the arrays backing the frame
+        self.derived = {}  # name -> object built from the frame by load_derived
+        # name -> derived object of the version this one replaced, still to be updated by ``delta``
+        self.carried = {}
+        self.delta = None
+
+
+def _freeze(df):
+    """Return a copy of ``df`` on read-only arrays it owns, and the ids of those arrays.
+
+    A session then can't mutate the shared frame in place, and derived
+    objects that view the arrays aren't counted as owning them. Only public
+    pandas APIs are used: every column is rebuilt from arrays copied out of
+    it, Arrow backed columns are immutable already and kept as they are.
+    """
+    columns, owned = {}, []
+    for name, column in df.items():
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            codes = column.array.codes.copy()
+            arrays = [codes]
+            values = pd.Categorical.from_codes(codes, dtype=column.dtype, validate=False)
+        elif isinstance(column.array, pd.arrays.IntegerArray | pd.arrays.FloatingArray | pd.arrays.BooleanArray):
+            data = column.to_numpy(dtype=column.dtype.numpy_dtype, na_value=column.dtype.type(0))
+            mask = pd.isna(column).to_numpy()
+            arrays = [data, mask]
+            values = type(column.array)(data, mask)
+        elif isinstance(column.array, pd.arrays.NumpyExtensionArray):
+            values = column.to_numpy(copy=True)
+            arrays = [values]
+        else:
+            values, arrays = column.array, []
+        for arr in arrays:
+            arr.setflags(write=False)
+        owned += arrays
+        columns[name] = values
+    frame = pd.DataFrame(columns, index=df.index, copy=False)
+    # the extension arrays too, a derived object holding a whole column holds the same one
+    owned += [column.array for _, column in frame.items()
+              if not isinstance(column.array, pd.arrays.NumpyExtensionArray)]
+    return frame, {id(arr) for arr in owned}
+
+
+def _base(arr):
+    while isinstance(arr.base, np.ndarray):
+        arr = arr.base
+    return arr
+
+
+def _deep_size(obj, seen):
+    """Estimate the bytes held by ``obj`` and everything it references that isn't in ``seen`` (ids)."""
+    if isinstance(obj, np.ndarray):
+        base = _base(obj)
+        if id(base) in seen:
+            return 0
+        seen.add(id(base))
+        size = base.nbytes
+        if base.dtype == object:
+            size += _items_size(base.ravel(), seen)
+        return size
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, (str, bytes, int, float, bool, type(None))):
+        return sys.getsizeof(obj)
+    if isinstance(obj, pd.Index):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, pd.Series):
+        return _deep_size(obj.index, seen) + _deep_size(obj.values, seen)
+    if isinstance(obj, pd.DataFrame):
+        return _deep_size(obj.index, seen) + sum(_deep_size(obj.iloc[:, i].values, seen) for i in range(obj.shape[1]))
+    if isinstance(obj, pd.Categorical):
+        return _deep_size(obj.codes, seen) + _deep_size(obj.categories, seen)
+    if isinstance(obj, pd.api.extensions.ExtensionArray):
+        return int(obj.nbytes)
+    if isinstance(obj, (pa.Array, pa.ChunkedArray, pa.Table, pa.RecordBatch)):
+        return obj.nbytes
+    if isinstance(obj, BaseFigure):
+        return _deep_size(obj.to_plotly_json(), seen)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + _items_size(list(obj.items()), seen)
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sys.getsizeof(obj) + _items_size(list(obj), seen)
+    attributes = getattr(obj, '__dict__', None)
+    return sys.getsizeof(obj) + (_deep_size(attributes, seen) if attributes is not None else 0)
+
+
+def _items_size(items, seen):
+    # extrapolated from an even sample of big collections, e.g. the search index's keys and postings
+    if len(items) <= _SIZE_SAMPLE:
+        return sum(_deep_size(item, seen) for item in items)
+    sample = items[::len(items) // _SIZE_SAMPLE]
+    return sum(_deep_size(item, seen) for item in sample) * len(items) // len(sample)
+
+
+def _evict():
+    total = sum(entry.size for entry in _cache.values())
+    while total > CACHE_MAX_BYTES and len(_cache) > 1:
+        _, entry = _cache.popitem(last=False)
+        total -= entry.size
+
+
+def _get_entry(path):
+    key = (os.path.abspath(path), dataset_version(path))
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    # only one thread builds at a time so concurrent sessions on a cold
+    # cache wait for the first build instead of all parsing the file
+    with _build_lock:
+        with _cache_lock:
+            if key in _cache:
+                _cache.move_to_end(key)
+                return _cache[key]
+        df = load_frame(path)
+        # measured before freezing, pandas can't inspect read-only object arrays
+        size = int(df.memory_usage(deep=True).sum())
+        frame, frame_arrays = _freeze(df)
+        entry = _Entry(frame, size, frame_arrays)
+        with _cache_lock:
+            previous = next((e for k, e in _cache.items() if k[0] == key[0]), None)
+        if previous is not None:
+            _carry_over(previous, entry)
+        with _cache_lock:
+            # drop older versions of the same file, they can't be asked for again
+            for old in [k for k in _cache if k[0] == key[0]]:
+                del _cache[old]
+            _cache[key] = entry
+            _evict()
+    return entry
+
+
+def _carry_over(previous, entry):
+    # only objects built for the previous version, the delta is between its frame and this one
+    carried = {name: obj for name, obj in previous.derived.items() if hasattr(obj, 'updated')}
+    if carried:
+        columns = sorted({col for obj in carried.values() for col in obj.delta_columns})
+        delta = diff_results(previous.frame, entry.frame, columns)
+        if len(delta.removed) + len(delta.added) <= _MAX_DELTA_SHARE * len(entry.frame):
+            entry.carried = carried
+            entry.delta = delta
+
+
+def load_results(path=DEFAULT_RESULTS_PATH):
+    """Return the prepared, read-only results frame for ``path``.
+
+    The frame is shared by every caller in the process, take a ``.copy()``
+    before modifying it.
+    """
+    return _get_entry(path).frame
+
+
+def load_derived(name, build, path=DEFAULT_RESULTS_PATH):
+    """Return ``build(frame)`` for the current version of ``path``, built once and shared.
+
+    Derived objects (indexes, figures, rollups) live with the cached frame,
+    so they are rebuilt, or updated if they know how, when the data file
+    changes and dropped when the frame is evicted or invalidated.
+    """
+    entry = _get_entry(path)
+    try:
+        return entry.derived[name]
+    except KeyError:
+        pass
+    with _build_lock:
+        if name not in entry.derived:
+            previous = entry.carried.pop(name, None)
+            if previous is None:
+                obj = build(entry.frame)
+            else:
+                obj = previous.updated(entry.frame, entry.delta)
+            entry.derived[name] = obj
+            if not entry.carried:
+                entry.delta = None
+            # count what the object holds beyond the frame against the cache budget
+            size = _deep_size(obj, set(entry.frame_arrays))
+            with _cache_lock:
+                entry.size += size
+                _evict()
+        return entry.derived[name]
+
+
+def clear_cache(path=None):
+    """Invalidate the cached frames and derived objects, for every file or just for ``path``."""
+    with _cache_lock:
+        if path is None:
+            _cache.clear()
+            forget_version()
+            return
+        path = os.path.abspath(path)
+        for key in [k for k in _cache if k[0] == path]:
+            del _cache[key]
+        forget_version(path)
@@ -0,0 +1,149 @@
+"""Extract runner rows from a results.finishtime.co.za results page.
+
+The results table has a fixed 17 cell layout (desktop and mobile copies of
+some columns, plus favourite/share action cells), so rather than inferring
+headers from the first row the cells are picked out by position.
+
+Pages are read with a streaming ``html.parser`` tokenizer that starts at the
+results table and keeps only the text, ``a.ltw-name`` text and flag image of
+the cells in ``HEADER_MAP``, in one pass per row, instead of building a
+BeautifulSoup tree and searching it cell by cell.
+"""
+from html.parser import HTMLParser
+
+TABLE_CLASS = 'table table-sm small align-middle ltw-cell-center'
+
+# cell index in each <tr> -> column name, the other cells are skipped
+HEADER_MAP = {
+    1: 'Pos',
+    4: 'Race No',
+    5: 'Wave',
+    6: 'Flag',
+    7: 'Name',
+    9: 'Time',
+    10: 'Net Time',
+    11: 'Category',
+    12: 'Cat Pos',
+    13: 'Gender',
+    14: 'Gen Pos',
+    15: 'Club',
+    16: 'Country',
+}
+HEADERS = [HEADER_MAP[i] for i in sorted(HEADER_MAP)]
+
+_LINKED_COLUMNS = {i for i, column in HEADER_MAP.items() if column in {'Name', 'Category', 'Gender', 'Club', 'Country'}}
+_FLAG_COLUMN = next(i for i, column in HEADER_MAP.items() if column == 'Flag')
+
+
+class _TableEnd(Exception):
+    pass
+
+
+class _ResultsTableParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows = []
+        self.depth = 0  # nesting depth of <table> inside the results table
+        self.row_index = -1
+        self.cells = None
+        self.cell = -1
+        self.next_cell = 0
+        self.text = []
+        self.link_text = None
+        self.in_link = False
+        self.flag = None
+
+    def _end_cell(self):
+        if self.cell in HEADER_MAP:
+            if self.cell == _FLAG_COLUMN:
+                # e.g. 'https://images.racetec.net/flags/16/ZA.png' -> 'ZA'
+                src = self.flag or ''
+                value = src.split('/')[-1].split('.')[0] if '/' in src else ''
+            elif self.cell in _LINKED_COLUMNS and self.link_text is not None:
+                value = ''.join(self.link_text)
+            else:
+                value = ''.join(self.text)
+            self.cells.append(value)
+        self.cell = -1
+
+    def _end_row(self):
+        if self.cells is None:
+            return
+        if self.cell >= 0:
+            self._end_cell()
+        # the first <tr> holds the headers
+        if self.row_index > 0 and len(self.cells) == len(HEADER_MAP):
+            self.rows.append(self.cells)
+        self.cells = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'table':
+            self.depth += 1
+        elif self.depth > 1:
+            # ignore anything inside a table nested in a cell
+            return
+        elif tag == 'tr':
+            self._end_row()
+            self.row_index += 1
+            self.cells = []
+            self.cell = -1
+            self.next_cell = 0
+        elif tag == 'td' and self.cells is not None:
+            if self.cell >= 0:
+                self._end_cell()
+            self.cell = self.next_cell
+            self.next_cell += 1
+            self.text = []
+            self.link_text = None
+            self.in_link = False
+            self.flag = None
+        elif self.cell in HEADER_MAP:
+            if tag == 'a' and self.link_text is None and 'ltw-name' in (dict(attrs).get('class') or '').split():
+                self.link_text = []
+                self.in_link = True
+            elif tag == 'img' and self.flag is None:
+                self.flag = dict(attrs).get('src', '')
+
+    def handle_endtag(self, tag):
+        if tag == 'table':
+            self.depth -= 1
+            if self.depth == 0:
+                self._end_row()
+                raise _TableEnd
+        elif self.depth > 1:
+            return
+        elif tag == 'td':
+            if self.cell >= 0:
+                self._end_cell()
+        elif tag == 'tr':
+            self._end_row()
+        elif tag == 'a':
+            self.in_link = False
+
+    def handle_data(self, data):
+        if self.cell in HEADER_MAP:
+            data = data.strip()
+            if data:
+                self.text.append(data)
+                if self.in_link:
+                    self.link_text.append(data)
+
+
+def parse_results_page(html):
+    """Return the runner rows on one results page as lists ordered like ``HEADERS``.
+
+    Returns an empty list when the page has no results table.
+    """
+    marker = html.find(TABLE_CLASS)
+    start = html.rfind('<table', 0, marker)
+    if marker < 0 or start < 0:
+        return []
+
+    parser = _ResultsTableParser()
+    try:
+        parser.feed(html[start:])
+        parser.close()
+    except _TableEnd:
+        pass
+    parser._end_row()
+    return parser.rows
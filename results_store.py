@@ -0,0 +1,258 @@
+"""Compiled columnar copy of the results CSV.
+
+Parsing the CSV means re-deriving the status and time columns from text on
+every cold start. ``compile_results`` does that once and writes an Arrow IPC
+file next to the CSV with typed columns: dictionary encoded categoricals,
+integer seconds for the times and a uint8 status code. ``load_frame`` reads
+that file memory-mapped and rebuilds the app's frame from it, recompiling
+whenever the CSV has changed since the artifact was written.
+
+The frame itself is kept just as compact (see ``prepare_results``): one
+``Int32`` seconds column per time with other units derived on demand,
+categoricals and Arrow backed strings, which ``memory_report`` breaks down
+per column.
+
+    python results_store.py comrades_2025_results.csv --memory-report
+"""
+import argparse
+import hashlib
+import json
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from time_parsing import STATUS_LABELS, parse_times
+
+ARTIFACT_FORMAT = 2
+
+# low cardinality text columns, stored dictionary encoded
+CATEGORICAL_COLUMNS = ['Wave', 'Flag', 'Category', 'Gender', 'Club', 'Country', 'Batch Letter', 'Wave Number']
+
+# the artifact's columns, in the order of ``prepare_results``, 'Time' and 'Net Time' hold int32 seconds
+# and 'Status' a uint8 code into STATUS_LABELS
+ARTIFACT_COLUMNS = ['Pos', 'Race No', 'Wave', 'Flag', 'Name', 'Time', 'Net Time', 'Category', 'Cat Pos', 'Gender',
+                    'Gen Pos', 'Club', 'Country', 'Batch Letter', 'Wave Number', 'Status']
+
+NAME_DTYPE = pd.StringDtype('pyarrow')
+
+# the final cut-off (Vic Clapham), 12 hours after the gun
+CUT_OFF_SECONDS = 12 * 60 * 60
+
+_fingerprints = {}  # path -> (mtime_ns, size, content hash)
+
+ResultsDelta = namedtuple('ResultsDelta', ['removed', 'added'])
+
+
+def dataset_version(path):
+    """Return a short content hash identifying the current version of ``path``.
+
+    The file is only re-hashed when its mtime or size changes.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    known = _fingerprints.get(path)
+    if known is not None and known[:2] == (stat.st_mtime_ns, stat.st_size):
+        return known[2]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    version = digest.hexdigest()[:16]
+    _fingerprints[path] = (stat.st_mtime_ns, stat.st_size, version)
+    return version
+
+
+def forget_version(path=None):
+    if path is None:
+        _fingerprints.clear()
+    else:
+        _fingerprints.pop(os.path.abspath(path), None)
+
+
+def prepare_results(df):
+    """Turn a raw results frame, as read from the CSV, into the app's compact frame.
+
+    Low cardinality text columns become categoricals, ``Name`` an Arrow
+    backed string, the positions nullable ``Int32`` and ``Time``/``Net Time``
+    are parsed into ``Time (seconds)``/``Net Time (seconds)`` (``Int32``, NA
+    for non-finishers) and a categorical ``Status``. Minutes, hours,
+    formatted times and the like are derived on demand (``finish_seconds``,
+    ``finish_hours``, ``time_parsing.format_seconds``) instead of stored.
+    """
+    # the status comes from the Time column, Net Time only contributes its seconds
+    status, seconds = parse_times(df['Time'])
+    _, net_seconds = parse_times(df['Net Time'])
+
+    # split the 'Wave' column into two columns on the " - " delimiter
+    waves = df['Wave'].astype('category')
+    batches = waves.cat.categories.str.split(' - ')
+    batch_letter = pd.Categorical(waves.cat.codes.map(dict(enumerate(batches.str[0]))))
+    wave_number = pd.Categorical(waves.cat.codes.map(dict(enumerate(batches.str[1]))))
+
+    return pd.DataFrame({
+        'Pos': df['Pos'].astype('Int32'),
+        'Race No': df['Race No'].astype('Int32'),
+        'Wave': waves,
+        'Flag': df['Flag'].astype('category'),
+        'Name': df['Name'].astype(NAME_DTYPE),
+        'Time (seconds)': _int_seconds(seconds),
+        'Net Time (seconds)': _int_seconds(net_seconds),
+        'Category': df['Category'].astype('category'),
+        'Cat Pos': df['Cat Pos'].astype('Int32'),
+        'Gender': df['Gender'].astype('category'),
+        'Gen Pos': df['Gen Pos'].astype('Int32'),
+        'Club': df['Club'].astype('category'),
+        'Country': df['Country'].astype('category'),
+        'Batch Letter': batch_letter,
+        'Wave Number': wave_number,
+        'Status': _status_categorical(status),
+    })
+
+
+def _int_seconds(seconds):
+    missing = np.isnan(seconds)
+    return pd.arrays.IntegerArray(np.rint(np.where(missing, 0, seconds)).astype(np.int32), missing)
+
+
+def _status_categorical(status):
+    return pd.Categorical.from_codes(status.astype(np.int8), categories=STATUS_LABELS)
+
+
+def finish_seconds(df):
+    """Return the gun finish times in seconds as a float array, NaN for non-finishers."""
+    return df['Time (seconds)'].to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def finish_hours(df):
+    """Return the gun finish times in hours as a float array, NaN for non-finishers."""
+    return finish_seconds(df) / 3600
+
+
+def memory_report(df):
+    """Return the memory held by each column of ``df``: dtype, bytes and share of the total."""
+    sizes = df.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({'dtype': df.dtypes.astype(str), 'bytes': sizes})
+    report.loc['total'] = ['', int(sizes.sum())]
+    report['share'] = (report['bytes'] / sizes.sum()).round(3)
+    return report
+
+
+def diff_results(old, new, columns=None, key='Race No'):
+    """Return the ``ResultsDelta`` between two versions of the results frame.
+
+    ``removed`` holds the old copy of every row that changed or went away and
+    ``added`` the new copy of every row that changed or appeared, so counts
+    over ``new`` are the counts over ``old`` less ``removed`` plus ``added``.
+    Rows are compared by a hash of their ``key`` and ``columns`` (all columns
+    by default), changes to other columns are ignored.
+    """
+    if columns is not None:
+        columns = [key] + [col for col in columns if col != key]
+    old_hashes = pd.util.hash_pandas_object(old if columns is None else old[columns], index=False)
+    new_hashes = pd.util.hash_pandas_object(new if columns is None else new[columns], index=False)
+    # pandas' isin is a hash table lookup, numpy's sorts both arrays
+    return ResultsDelta(removed=old[~old_hashes.isin(new_hashes).to_numpy()],
+                        added=new[~new_hashes.isin(old_hashes).to_numpy()])
+
+
+def artifact_path(csv_path):
+    return os.path.splitext(csv_path)[0] + '.arrow'
+
+
+def _to_table(df, source_version):
+    columns = {}
+    for col in ARTIFACT_COLUMNS:
+        if col in CATEGORICAL_COLUMNS:
+            # the dictionary keeps the categorical's sorted categories, not the order values first appear in
+            codes = df[col].cat.codes.to_numpy()
+            categories = pa.array(df[col].cat.categories.astype(object), type=pa.string())
+            columns[col] = pa.DictionaryArray.from_arrays(pa.array(codes, mask=codes < 0), categories)
+        elif col in ('Time', 'Net Time'):
+            columns[col] = pa.array(df[f'{col} (seconds)'], type=pa.int32())
+        elif col == 'Name':
+            columns[col] = pa.array(df[col], type=pa.string())
+        elif col == 'Status':
+            columns[col] = pa.array(df[col].cat.codes.astype(np.uint8), type=pa.uint8())
+        else:
+            columns[col] = pa.array(df[col], type=pa.int32())
+
+    metadata = {
+        'format': str(ARTIFACT_FORMAT),
+        'source_version': source_version,
+        'status_labels': json.dumps(STATUS_LABELS),
+    }
+    return pa.table(columns).replace_schema_metadata(metadata)
+
+
+def compile_results(csv_path, out_path=None):
+    """Parse ``csv_path`` and write the typed Arrow artifact, returns its path."""
+    out_path = out_path or artifact_path(csv_path)
+    source_version = dataset_version(csv_path)
+    table = _to_table(prepare_results(pd.read_csv(csv_path)), source_version)
+
+    # write next to the target and rename so readers never see a half written file
+    tmp_path = f'{out_path}.{os.getpid()}.tmp'
+    feather.write_feather(table, tmp_path, compression='uncompressed')
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+def _artifact_is_fresh(csv_path, path):
+    try:
+        metadata = feather.read_table(path, columns=[], memory_map=True).schema.metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return False
+    return (metadata.get(b'format') == str(ARTIFACT_FORMAT).encode()
+            and metadata.get(b'source_version') == dataset_version(csv_path).encode())
+
+
+def read_table(csv_path, columns=None):
+    """Return the compiled Arrow table for ``csv_path``, memory-mapped.
+
+    Only ``columns`` are read when given. The artifact is rebuilt first if it
+    is missing or was compiled from an older version of the CSV.
+    """
+    path = artifact_path(csv_path)
+    if not _artifact_is_fresh(csv_path, path):
+        compile_results(csv_path, path)
+    return feather.read_table(path, columns=columns, memory_map=True)
+
+
+def table_to_frame(table):
+    """Rebuild the app's compact results frame from the compiled table."""
+    df = table.to_pandas(types_mapper={pa.int32(): pd.Int32Dtype(), pa.string(): NAME_DTYPE}.get)
+    df = df.rename(columns={'Time': 'Time (seconds)', 'Net Time': 'Net Time (seconds)'})
+    df['Status'] = _status_categorical(df['Status'].to_numpy())
+    return df
+
+
+def load_frame(csv_path):
+    """Return the prepared results frame for ``csv_path``.
+
+    Reads the compiled artifact when possible and falls back to parsing the
+    CSV directly if the artifact can't be written (e.g. a read-only checkout).
+    """
+    try:
+        table = read_table(csv_path)
+    except OSError:
+        return prepare_results(pd.read_csv(csv_path))
+    return table_to_frame(table)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compile a results CSV into the typed Arrow artifact used by the app.')
+    parser.add_argument('csv_path', nargs='?', default='comrades_2025_results.csv')
+    parser.add_argument('-o', '--output', help='artifact path (defaults to the CSV path with an .arrow suffix)')
+    parser.add_argument('--memory-report', action='store_true',
+                        help="print the memory used by each column of the app's frame")
+    args = parser.parse_args()
+
+    out_path = compile_results(args.csv_path, args.output)
+    print(f'Wrote {out_path} ({os.path.getsize(out_path) / 1e6:.1f} MB)')
+    if args.memory_report:
+        print(memory_report(table_to_frame(feather.read_table(out_path, memory_map=True))).to_string())
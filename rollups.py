@@ -0,0 +1,135 @@
+"""Group counts of the results frame, computed once per dataset version.
+
+The bar charts each ran their own ``value_counts()`` over the full frame and
+the percentile code merged a ``groupby('Category').size()`` back onto every
+row just to divide by the category size. ``Rollups`` does one groupby over
+the frame into a small cube of counts per combination of ``DIMENSIONS`` and
+derives every breakdown from that cube:
+
+* ``counts(dimension)``: participants per value, largest first,
+* ``table(dimension)``: ``count``, ``finishers`` and ``finisher_ratio`` per value,
+* ``size(dimension, value)``: the size of one group, e.g. a category.
+
+When the results file changes, ``updated`` counts only the rows that changed
+and adds those counts to the tables, instead of grouping the whole new frame
+again.
+"""
+import numpy as np
+import pandas as pd
+
+DIMENSIONS = ['Status', 'Country', 'Category', 'Gender', 'Wave Number', 'Batch Letter']
+
+FINISHED = 'Finished'
+
+
+def _cube(df, dimensions):
+    return df.groupby(list(dimensions), observed=True, dropna=False, sort=False).size()
+
+
+def _changes(delta, dimension, sign, finished):
+    # the values the rows of ``delta`` left or joined and, per value, the change in participants and finishers
+    removed, added = delta.removed[dimension], delta.added[dimension]
+    if isinstance(removed.dtype, pd.CategoricalDtype) and removed.dtype == added.dtype:
+        # both copies share the categories, count by code with missing values in one more slot
+        codes = np.concatenate([removed.array.codes, added.array.codes]).astype(np.intp)
+        codes[codes < 0] = len(removed.dtype.categories)
+        values = np.append(removed.dtype.categories.to_numpy(dtype=object), np.nan)
+    else:
+        codes, values = pd.factorize(np.concatenate([removed.to_numpy(dtype=object), added.to_numpy(dtype=object)]),
+                                     use_na_sentinel=False)
+    counts = np.bincount(codes, weights=sign, minlength=len(values)).astype('int64')
+    finishers = np.bincount(codes, weights=sign * finished, minlength=len(values)).astype('int64')
+    changed = (counts != 0) | (finishers != 0)
+    return np.asarray(values, dtype=object)[changed], counts[changed], finishers[changed]
+
+
+def _table(index, counts, finishers):
+    order = np.argsort(-counts, kind='stable')
+    counts, finishers = counts[order], finishers[order]
+    return pd.DataFrame({'count': counts, 'finishers': finishers, 'finisher_ratio': finishers / counts},
+                        index=index[order])
+
+
+class Rollups:
+    def __init__(self, df, dimensions=DIMENSIONS):
+        if 'Status' not in dimensions:
+            raise ValueError("the rollup dimensions must include 'Status'")
+        self.dimensions = list(dimensions)
+        # the only pass over the frame, everything else works on the cube
+        # (a few hundred rows for a 22k field)
+        cube = _cube(df, dimensions)
+        self.total = int(cube.sum())
+        finished = cube.index.get_level_values('Status') == FINISHED
+        self.finishers = int(cube[finished].sum())
+        self._tables = {dimension: self._build_table(cube, dimension, finished) for dimension in self.dimensions}
+
+    def updated(self, df, delta):
+        """Return the rollups of ``df``, given these are the rollups of ``df`` before ``delta``.
+
+        Only the rows in ``delta`` (a ``results_store.ResultsDelta``) are
+        counted, the tables of the values they left or joined are moved by
+        those counts and the tables nothing changed in are shared with these
+        rollups.
+        """
+        rollups = Rollups.__new__(Rollups)
+        rollups.dimensions = self.dimensions
+        # -1 for the old copy of a row, +1 for the new one
+        sign = np.repeat([-1, 1], [len(delta.removed), len(delta.added)])
+        finished = np.concatenate([delta.removed['Status'].to_numpy() == FINISHED,
+                                   delta.added['Status'].to_numpy() == FINISHED])
+        rollups.total = self.total + int(sign.sum())
+        rollups.finishers = self.finishers + int(sign[finished].sum())
+        rollups._tables = {}
+        for dimension in self.dimensions:
+            table = self._tables[dimension]
+            values, counts, finishers = _changes(delta, dimension, sign, finished)
+            if not len(values):
+                rollups._tables[dimension] = table
+                continue
+            at = table.index.get_indexer(values)
+            joined = values[at < 0]
+            if len(joined):
+                # values no row had before, the index takes the new frame's dtype to hold them
+                index = pd.Index(table.index.astype(object).append(pd.Index(joined, dtype=object)), name=dimension)
+                if isinstance(df[dimension].dtype, pd.CategoricalDtype):
+                    index = pd.CategoricalIndex(index, dtype=df[dimension].dtype, name=dimension)
+                at[at < 0] = np.arange(len(table), len(index))
+            else:
+                index = table.index
+            new_counts = np.zeros(len(index), dtype='int64')
+            new_counts[:len(table)] = table['count'].to_numpy()
+            new_finishers = np.zeros(len(index), dtype='int64')
+            new_finishers[:len(table)] = table['finishers'].to_numpy()
+            np.add.at(new_counts, at, counts)
+            np.add.at(new_finishers, at, finishers)
+            kept = new_counts > 0
+            rollups._tables[dimension] = _table(index[kept], new_counts[kept], new_finishers[kept])
+        return rollups
+
+    @property
+    def delta_columns(self):
+        # the columns whose changes ``updated`` has to be told about
+        return self.dimensions
+
+    @staticmethod
+    def _build_table(cube, dimension, finished):
+        by_value = dict(level=dimension, observed=True, dropna=False, sort=False)
+        counts = cube.groupby(**by_value).sum()
+        finishers = cube[finished].groupby(**by_value).sum().reindex(counts.index, fill_value=0)
+        return _table(counts.index, counts.to_numpy(), finishers.to_numpy())
+
+    def table(self, dimension):
+        """Return the ``count``, ``finishers`` and ``finisher_ratio`` table for ``dimension``."""
+        return self._tables[dimension]
+
+    def counts(self, dimension):
+        """Return the number of participants per value of ``dimension``, largest first."""
+        return self._tables[dimension]['count']
+
+    def size(self, dimension, value):
+        """Return the number of participants whose ``dimension`` is ``value`` (0 if there are none)."""
+        return int(self.counts(dimension).get(value, 0))
+
+    @property
+    def finisher_ratio(self):
+        return self.finishers / self.total if self.total else float('nan')
@@ -0,0 +1,111 @@
+"""Append-only on-disk store for scraped result rows.
+
+Each scraped page is written as one Arrow record batch to an IPC stream
+segment as soon as it is parsed, so memory stays flat however many pages or
+races are scraped. Every run appends to a new segment, which makes the
+directory double as the scraper's resume checkpoint: a torn batch at the end
+of an interrupted segment is simply ignored. The final CSV/Arrow file is
+built once from the memory-mapped segments in page order.
+"""
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+PAGE_COLUMN = '__page'
+
+
+class RowSink:
+    """Write pages of string rows with the given ``columns`` under ``directory``."""
+
+    def __init__(self, directory, columns):
+        self.directory = directory
+        self.columns = list(columns)
+        self.row_schema = pa.schema([(col, pa.string()) for col in self.columns])
+        self.schema = self.row_schema.append(pa.field(PAGE_COLUMN, pa.int32()))
+        self._file = None
+        self._writer = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _segments(self):
+        return sorted(os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                      if name.startswith('rows-') and name.endswith('.arrows'))
+
+    def _read_segments(self):
+        # yields (page, batch) for every complete batch, the batches stay memory-mapped
+        for path in self._segments():
+            try:
+                reader = pa.ipc.open_stream(pa.memory_map(path))
+            except (pa.ArrowInvalid, OSError):
+                continue
+            while True:
+                try:
+                    batch = reader.read_next_batch()
+                except (StopIteration, pa.ArrowInvalid, OSError):
+                    # end of the segment, or a batch torn by an interrupted run
+                    break
+                yield batch.column(PAGE_COLUMN)[0].as_py(), batch
+
+    def pages(self):
+        """Return the set of page numbers already stored."""
+        return {page for page, _ in self._read_segments()}
+
+    def write_page(self, page, rows):
+        if self._writer is None:
+            path = os.path.join(self.directory, f'rows-{len(self._segments()):05d}.arrows')
+            self._file = open(path, 'wb')
+            self._writer = pa.ipc.new_stream(self._file, self.schema)
+
+        if rows:
+            arrays = [pa.array(values, type=pa.string()) for values in zip(*rows)]
+            arrays.append(pa.array([page] * len(rows), type=pa.int32()))
+        else:
+            # a single all-null row marks an empty page as done
+            arrays = [pa.nulls(1, pa.string()) for _ in self.columns] + [pa.array([page], type=pa.int32())]
+        self._writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._file.close()
+            self._writer = self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def iter_batches(self):
+        """Yield the stored rows one page at a time in page order, without the page column."""
+        latest = {}
+        for page, batch in self._read_segments():
+            latest[page] = batch
+        for page in sorted(latest):
+            batch = latest[page]
+            if batch.column(0).null_count == batch.num_rows:
+                continue
+            yield batch.drop_columns([PAGE_COLUMN])
+
+    def write_csv(self, path):
+        """Write every stored row to ``path`` as CSV, returns the number of rows.
+
+        Pages are appended one at a time through pandas so the file is
+        formatted exactly like the CSVs the notebook used to write.
+        """
+        rows = 0
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            pd.DataFrame(columns=self.columns).to_csv(f, index=False)
+            for batch in self.iter_batches():
+                batch.to_pandas().to_csv(f, header=False, index=False)
+                rows += batch.num_rows
+        return rows
+
+    def write_arrow(self, path):
+        """Write every stored row to ``path`` as an Arrow IPC file, returns the number of rows."""
+        table = pa.Table.from_batches(list(self.iter_batches()), schema=self.row_schema)
+        feather.write_feather(table, path, compression='uncompressed')
+        return table.num_rows
@@ -0,0 +1,209 @@
+"""Scrape race results from results.finishtime.co.za.
+
+Pages are fetched concurrently over a pooled HTTP session. A token bucket
+keeps the request rate polite, failed requests are retried with exponential
+backoff, and every parsed page is streamed straight into an on-disk
+``RowSink`` that doubles as the checkpoint, so an interrupted run picks up
+where it left off and memory doesn't grow with the number of pages.
+
+The raw pages are kept in a ``PageCache`` (``.scrape/<race id>/pages``) and
+re-requested conditionally on their ETag/Last-Modified, and
+``page_cache.py`` rebuilds the results from that cache without fetching.
+
+    python scraper.py --race-id 30205 --last-page 454 -o comrades_2025_results.csv
+
+With ``--year`` and ``--race`` the results are written into that edition's
+partition of the results catalog (see ``results_catalog``) and registered
+there.
+
+Use ``fixture_server.py`` and ``--base-url`` to run against local pages.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from results_catalog import CATALOG_DIR, RACES, Catalog, partition_key
+from page_cache import PageCache
+from results_parser import HEADERS, parse_results_page
+from row_sink import RowSink
+
+BASE_URL = 'https://results.finishtime.co.za/results.aspx'
+DEFAULT_PARAMS = {'CId': 35, 'RId': 30205, 'EId': 1, 'dt': 0}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Allow ``rate`` requests per second on average, with bursts of up to ``capacity``."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_for = (1 - self.tokens) / self.rate
+            time.sleep(wait_for)
+
+
+def open_checkpoint(directory, params):
+    """Return the row sink used as the resume checkpoint for one race.
+
+    The scrape parameters are recorded alongside it so a directory can't be
+    resumed for a different race by mistake.
+    """
+    os.makedirs(directory, exist_ok=True)
+    meta_path = os.path.join(directory, 'meta.json')
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            saved = json.load(f)
+        if saved != params:
+            raise ValueError(f'{directory} holds a checkpoint for {saved}, not {params}')
+    else:
+        with open(meta_path, 'w') as f:
+            json.dump(params, f)
+    return RowSink(directory, HEADERS)
+
+
+def make_session(pool_size):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def fetch_page(session, bucket, url, params, retries=5, backoff=1.0, timeout=30, cache=None):
+    """GET one results page, retrying connection errors and 429/5xx responses.
+
+    With a ``cache`` the request is conditional on the cached copy, a 304 is
+    answered from the cache and a new copy is stored in it.
+    """
+    page = params.get('PageNo')
+    headers = cache.conditional_headers(page) if cache is not None else None
+    for attempt in range(retries + 1):
+        bucket.acquire()
+        try:
+            response = session.get(url, params=params, timeout=timeout, headers=headers)
+            if response.status_code == 304 and cache is not None:
+                return cache.read(page)
+            if response.status_code not in RETRY_STATUSES:
+                response.raise_for_status()
+                if cache is not None:
+                    cache.store(page, response.text, response.headers.get('ETag'),
+                                response.headers.get('Last-Modified'))
+                return response.text
+            error = requests.HTTPError(f'{response.status_code} for {response.url}', response=response)
+        except (requests.ConnectionError, requests.Timeout) as exc:
+            error = exc
+        if attempt == retries:
+            raise error
+        delay = backoff * 2 ** attempt * (1 + random.random())
+        logger.warning('page %s failed (%s), retrying in %.1fs', params.get('PageNo'), error, delay)
+        time.sleep(delay)
+
+
+def scrape_pages(pages, base_url=BASE_URL, params=DEFAULT_PARAMS, concurrency=4, rate=1.0, retries=5, cache=None):
+    """Fetch and parse ``pages`` concurrently, yielding ``(page, rows)`` as each one finishes."""
+    session = make_session(concurrency)
+    bucket = TokenBucket(rate, capacity=concurrency)
+
+    def work(page):
+        html = fetch_page(session, bucket, base_url, {**params, 'PageNo': page}, retries=retries, cache=cache)
+        return parse_results_page(html)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {pool.submit(work, page): page for page in pages}
+        try:
+            pending = set(futures)
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    yield futures[future], future.result()
+        finally:
+            # stop queued pages if the consumer stops early or a page fails for good
+            for future in futures:
+                future.cancel()
+
+
+def scrape(pages, sink, **options):
+    """Scrape the ``pages`` not already in ``sink`` and append their rows to it."""
+    done = sink.pages()
+    todo = [page for page in pages if page not in done]
+    logger.info('%d pages already done, %d to fetch', len(done), len(todo))
+    for count, (page, rows) in enumerate(scrape_pages(todo, **options), start=len(done) + 1):
+        sink.write_page(page, rows)
+        logger.info('page %d: %d rows (%d/%d pages)', page, len(rows), count, len(pages))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scrape finishtime results into a CSV.')
+    parser.add_argument('--race-id', type=int, default=DEFAULT_PARAMS['RId'], help='finishtime RId')
+    parser.add_argument('--first-page', type=int, default=1)
+    parser.add_argument('--last-page', type=int, default=454)
+    parser.add_argument('--base-url', default=BASE_URL)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--rate', type=float, default=1.0, help='average requests per second')
+    parser.add_argument('--retries', type=int, default=5)
+    parser.add_argument('--checkpoint-dir', help='defaults to .scrape/<race id>')
+    parser.add_argument('--cache-dir', help='raw page cache, defaults to pages/ in the checkpoint directory')
+    parser.add_argument('--no-cache', action='store_true', help="don't keep the raw pages")
+    parser.add_argument('-o', '--output',
+                        help='CSV path, or a .arrow path for an Arrow IPC file (defaults to '
+                             'comrades_2025_results.csv, or the catalog partition with --year and --race)')
+    parser.add_argument('--year', type=int, help='register the results in the catalog as this year')
+    parser.add_argument('--race', choices=RACES, help='register the results in the catalog as an up or down run')
+    parser.add_argument('--catalog', default=CATALOG_DIR, help='results catalog directory')
+    args = parser.parse_args()
+    if (args.year is None) != (args.race is None):
+        parser.error('--year and --race go together')
+    if args.year is not None and args.output and args.output.endswith('.arrow'):
+        parser.error('catalog partitions are stored as CSV')
+    if args.output is None:
+        args.output = ('comrades_2025_results.csv' if args.year is None else
+                       os.path.join(args.catalog, partition_key(args.year, args.race), 'results.csv'))
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    params = {**DEFAULT_PARAMS, 'RId': args.race_id}
+    checkpoint_dir = args.checkpoint_dir or os.path.join('.scrape', str(args.race_id))
+    cache = None if args.no_cache else PageCache(args.cache_dir or os.path.join(checkpoint_dir, 'pages'))
+    with open_checkpoint(checkpoint_dir, params) as sink:
+        scrape(range(args.first_page, args.last_page + 1), sink, base_url=args.base_url, params=params,
+               concurrency=args.concurrency, rate=args.rate, retries=args.retries, cache=cache)
+    if os.path.dirname(args.output):
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    if args.output.endswith('.arrow'):
+        rows = sink.write_arrow(args.output)
+    else:
+        rows = sink.write_csv(args.output)
+    print(f'Wrote {rows} rows to {args.output}')
+
+    if args.year is not None:
+        catalog = Catalog.open(args.catalog)
+        partition = catalog.add(args.year, args.race, args.output, race_id=args.race_id)
+        catalog.save()
+        print(f'Registered {partition.key} in {args.catalog}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Vectorized parsing of the finishtime ``Time``/``Net Time`` columns.
+
+The columns hold either an ``HH:MM:SS`` time or one of the status words
+below. ``parse_times`` reads both the status and the seconds in a single
+pass over a fixed-width byte view of the column, and ``format_seconds`` turns
+seconds back into ``HH:MM:SS`` strings without a per-row Python call.
+"""
+import numpy as np
+import pandas as pd
+
+STATUS_LABELS = ['Finished', 'Did Not Finish', 'Not started', 'Unofficial Finisher', 'Started', 'Did Not Start']
+
+# the word finishtime puts in the time column for each status code above
+STATUS_TOKENS = ['', 'DNF', 'Not started', 'UOF', 'Started', 'DNS']
+
+# one byte wider than the longest token, a non-zero last byte flags a longer string
+_WIDTH = max(len(token) for token in STATUS_TOKENS) + 1
+_TOKENS = np.array([token.encode() for token in STATUS_TOKENS], dtype=f'S{_WIDTH}')
+
+# the tokens all differ in their first and third byte, so (first, third) -> code
+_TOKEN_LOOKUP = np.zeros(1 << 16, dtype=np.uint8)
+for _code, _token in enumerate(STATUS_TOKENS[1:], start=1):
+    _TOKEN_LOOKUP[ord(_token[0]) << 8 | ord(_token[2])] = _code
+
+_SLOW_PATTERN = r'(?P<h>\d+):(?P<m>\d{2}):(?P<s>\d{2})'
+
+
+def _parse_slow(values):
+    # fallback for anything that isn't exactly HH:MM:SS or a status word,
+    # matching the old str.contains/str.replace/to_timedelta behaviour
+    values = pd.Series(values, dtype=object).fillna('').astype(str)
+    status = np.zeros(len(values), dtype=np.uint8)
+    for code in range(len(STATUS_TOKENS) - 1, 0, -1):
+        status[values.str.contains(STATUS_TOKENS[code], regex=False).to_numpy()] = code
+    parts = values.str.extract(_SLOW_PATTERN).astype('float64')
+    seconds = (parts['h'] * 3600 + parts['m'] * 60 + parts['s']).to_numpy()
+    return status, seconds
+
+
+def parse_times(values):
+    """Split a column of finishtime times into status codes and seconds.
+
+    Returns ``(status, seconds)``: a uint8 array indexing ``STATUS_LABELS``
+    and a float64 array of seconds that is NaN wherever there is no time.
+    """
+    values = pd.Series(values, copy=False).to_numpy(dtype=object, na_value='')
+    n = len(values)
+    try:
+        raw = values.astype(f'S{_WIDTH}')
+    except UnicodeEncodeError:
+        return _parse_slow(values)
+    b = raw.view(np.uint8).reshape(n, _WIDTH)
+
+    digits = b[:, [0, 1, 3, 4, 6, 7]].astype(np.int32) - 48
+    is_time = ((digits >= 0) & (digits <= 9)).all(axis=1) & (b[:, 2] == 58) & (b[:, 5] == 58) & (b[:, 8] == 0)
+    seconds = ((digits[:, 0] * 10 + digits[:, 1]) * 3600
+               + (digits[:, 2] * 10 + digits[:, 3]) * 60
+               + digits[:, 4] * 10 + digits[:, 5]).astype(np.float64)
+    seconds[~is_time] = np.nan
+
+    status = _TOKEN_LOOKUP[b[:, 0].astype(np.intp) << 8 | b[:, 2]]
+    is_token = (raw == _TOKENS[status]) & (status > 0)
+    status[~is_token] = 0
+
+    # anything else, including strings too long for the byte view, goes the slow way
+    leftover = ~(is_time | is_token | (raw == b'')) | (b[:, -1] != 0)
+    if leftover.any():
+        status[leftover], seconds[leftover] = _parse_slow(values[leftover])
+    return status, seconds
+
+
+def status_labels(status):
+    """Map status codes from ``parse_times`` to their display labels."""
+    return np.asarray(STATUS_LABELS, dtype=object)[status]
+
+
+def format_seconds(seconds):
+    """Format seconds as ``HH:MM:SS`` strings, with "" for missing values."""
+    seconds = np.asarray(seconds, dtype=np.float64)
+    missing = np.isnan(seconds)
+    total = np.rint(np.where(missing, 0, seconds)).astype(np.int64)
+    hours, remainder = np.divmod(total, 3600)
+    minutes, secs = np.divmod(remainder, 60)
+    if hours.size and hours.max() > 99:
+        out = np.array([f'{h:02d}:{m:02d}:{s:02d}' for h, m, s in zip(hours, minutes, secs)], dtype=object)
+    else:
+        b = np.full((len(total), 8), ord(':'), dtype=np.uint8)
+        for col, part in ((0, hours), (3, minutes), (6, secs)):
+            b[:, col] = 48 + part // 10
+            b[:, col + 1] = 48 + part % 10
+        out = b.view('S8').ravel().astype('U8').astype(object)
+    out[missing] = ''
+    return out